@@ -1,9 +1,16 @@
-from fastapi import APIRouter, HTTPException ,Depends, status
+from fastapi import APIRouter, HTTPException ,Depends, status, Query
 from fastapi.security import OAuth2PasswordBearer
-from ..db.models import UserModel,GetUser,GetAllUsers,CreateUserSchema,UpdateSchema
+from ..db.models import UserModel,GetUser,GetAllUsers,CreateUserSchema,UpdateSchema,RefreshSchema,LogoutSchema,GetRevocations
 from ..db.session import get_session
-from sqlmodel import Session, select
-from ..helpers.security import hash_password,verify_password,create_access_token,decode_access_token
+from sqlmodel import select
+from sqlalchemy.exc import IntegrityError
+from pydantic import ValidationError
+from sqlmodel.ext.asyncio.session import AsyncSession
+from ..helpers.security import hash_password,verify_and_rehash,create_access_token,create_refresh_token,decode_access_token,decode_refresh_token,user_claims
+from ..helpers.revocation import revocation_list,revoke,revoked_since
+from ..helpers.user_cache import user_cache
+from ..helpers.config import ME_SOURCE
+from ..helpers.hashing import hashing_pool
 from jose import jwt, JWTError
 
 
@@ -12,11 +19,11 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")  # points to your login r
 
 
 @router.post('/register',response_model = GetUser)
-async def register(user:CreateUserSchema,session: Session = Depends(get_session)):
+async def register(user:CreateUserSchema,session: AsyncSession = Depends(get_session)):
 
-    existing_user = session.exec(
+    existing_user = (await session.exec(
         select(UserModel).where(UserModel.email == user.email)
-    ).first()
+    )).first()
 
     if existing_user:
         raise HTTPException(status_code=400,detail="Email already registered")
@@ -24,54 +31,144 @@ async def register(user:CreateUserSchema,session: Session = Depends(get_session)
 
     user = UserModel(
         email = user.email,
-        hashed_password = hash_password(user.password)
+        hashed_password = await hashing_pool.run(hash_password, user.password)
     )
 
     session.add(user)
-    session.commit()
-    session.refresh(user)
+    try:
+        await session.commit()
+    except IntegrityError:
+        # lost a race with a concurrent registration for the same email
+        await session.rollback()
+        raise HTTPException(status_code=400,detail="Email already registered")
+    await session.refresh(user)
     return user
 
 
 
 
 @router.post('/login')
-async def login(user:CreateUserSchema, session:Session = Depends(get_session)):
+async def login(user:CreateUserSchema, session:AsyncSession = Depends(get_session)):
 
-    db_user = session.exec(
+    db_user = (await session.exec(
         select(UserModel).where(UserModel.email == user.email)
-    ).first()
+    )).first()
+
+    if not db_user:
+        raise HTTPException(status_code=401, detail="Invalid email or password")
 
-    if not user or not verify_password(user.password,db_user.hashed_password):
+    verified, new_hash = await hashing_pool.run(verify_and_rehash, user.password, db_user.hashed_password)
+    if not verified:
         raise HTTPException(status_code=401, detail="Invalid email or password")
 
+    # stored hash was made with an old cost, swap in the fresh one
+    if new_hash:
+        db_user.hashed_password = new_hash
+        session.add(db_user)
+        await session.commit()
+
+
+    access_token = create_access_token(data=user_claims(db_user))
+    refresh_token = create_refresh_token(db_user.id)
+    return {"access_token":access_token,"refresh_token":refresh_token,"token_type":"bearer"}
+
+
+
+# New access token without a password check; the refresh token is rotated on every use
+@router.post('/refresh')
+async def refresh(body:RefreshSchema, session:AsyncSession = Depends(get_session)):
 
-    access_token = create_access_token(data={"sub":str(db_user.id)})
-    return {"access_token":access_token,"token_type":"bearer"}
+    payload = decode_refresh_token(body.refresh_token)
+    if payload is None or revocation_list.is_revoked(payload.get("jti"), payload.get("exp")):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid or expired refresh token")
 
+    db_user = await session.get(UserModel, int(payload["sub"]))
+    if db_user is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
 
+    # read before revoke() commits or rolls back, either of which expires db_user
+    claims, user_id = user_claims(db_user), db_user.id
 
-def get_current_user(token:str = Depends(oauth2_scheme), session: Session = Depends(get_session)) -> UserModel:
+    # a refresh token is spent once; a replay, or a concurrent refresh that lost, gets nothing
+    if not await revoke(session, (payload["jti"], payload["exp"])):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid or expired refresh token")
 
+    access_token = create_access_token(data=claims)
+    refresh_token = create_refresh_token(user_id)
+    return {"access_token":access_token,"refresh_token":refresh_token,"token_type":"bearer"}
+
+
+
+@router.post('/logout', status_code=204)
+async def logout(body:LogoutSchema | None = None, token:str = Depends(oauth2_scheme), session:AsyncSession = Depends(get_session)):
 
     payload = decode_access_token(token)
     if payload is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid or expired token")
 
+    # both tokens are checked before either is revoked, and then revoked together,
+    # so a logout that fails leaves the session as it was
+    tokens = []
+    if payload.get("jti"):
+        tokens.append((payload["jti"], payload["exp"]))
+
+    if body and body.refresh_token:
+        refresh_payload = decode_refresh_token(body.refresh_token)
+        if refresh_payload is not None and refresh_payload.get("sub") == payload.get("sub"):
+            tokens.append((refresh_payload["jti"], refresh_payload["exp"]))
+
+    if tokens and not await revoke(session, *tokens):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid or expired token")
+
+    return None
+
+
+
+# Revoked token ids still within their lifetime, polled by meal_service
+@router.get('/revocations', response_model=GetRevocations)
+async def list_revocations(after:int = Query(0, ge=0), session:AsyncSession = Depends(get_session)):
+
+    rows = await revoked_since(session, after)
+    return {
+        "revoked": [{"jti": row.jti, "exp": row.expires_at} for row in rows],
+        "last_id": rows[-1].id if rows else after,
+    }
+
+
+
+async def get_current_user(token:str = Depends(oauth2_scheme), session: AsyncSession = Depends(get_session)) -> GetUser:
+
+
+    payload = decode_access_token(token)
+    if payload is None or revocation_list.is_revoked(payload.get("jti"), payload.get("exp")):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid or expired token")
+
     user_id: str = payload.get("sub")
 
     if user_id is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token payload")
 
-    user = session.get(UserModel, int(user_id))
+    # the token is signed, so its claims are as good as the row (until it expires)
+    if ME_SOURCE == 'claims':
+        try:
+            return GetUser(id=user_id, email=payload["email"], created_at=payload["created_at"], updated_at=payload["updated_at"])
+        except (KeyError, ValidationError):
+            pass  # token issued before claims were embedded, look the user up instead
+
+    cached = user_cache.get(int(user_id))
+    if cached is not None:
+        return cached
+
+    user = await session.get(UserModel, int(user_id))
     if user is None:
          raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
+    user_cache.set(user)
     return user
 
 
 
 @router.get('/me',response_model=GetUser)
-async def fetch_user(user:UserModel = Depends(get_current_user)):
+async def fetch_user(user:GetUser = Depends(get_current_user)):
     return user
 
 
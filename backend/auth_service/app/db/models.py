@@ -11,7 +11,7 @@ def get_utc_now():
 
 class UserModel(SQLModel,table =True):
     id: Optional[int] = Field(default=None, primary_key = True)
-    email: str
+    email: str = Field(unique=True, index=True)
     hashed_password: str
 
     created_at: datetime = Field(default_factory=get_utc_now,
@@ -23,6 +23,15 @@ class UserModel(SQLModel,table =True):
                                 nullable=False)
 
 
+class RevokedToken(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    jti: str = Field(unique=True, index=True)
+    expires_at: int = Field(index=True)  # the token's own exp (unix seconds), rows are purged after it
+    revoked_at: datetime = Field(default_factory=get_utc_now,
+                                sa_type=DateTime(timezone=True),
+                                nullable=False)
+
+
 class CreateUserSchema(SQLModel):
     email: str
     password:str
@@ -45,6 +54,19 @@ class GetAllUsers(SQLModel):
     count:int
 
 
+class RefreshSchema(SQLModel):
+    refresh_token: str
+
+
+class LogoutSchema(SQLModel):
+    refresh_token: Optional[str] = None
+
 
+class GetRevokedToken(SQLModel):
+    jti: str
+    exp: int
 
 
+class GetRevocations(SQLModel):
+    revoked: List[GetRevokedToken]
+    last_id: int
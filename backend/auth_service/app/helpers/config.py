@@ -3,4 +3,32 @@ from decouple import config
 DATABASE_URL = config('DATABASE_URL')
 SECRET_KEY = config('SECRET_KEY')
 ALGORITHM = config('ALGORITHM', default='HS256')
-ACCESS_TOKEN_EXPIRE_MINUTES = config('ACCESS_TOKEN_EXPIRE_MINUTES', cast=int, default=30)
\ No newline at end of file
+ACCESS_TOKEN_EXPIRE_MINUTES = config('ACCESS_TOKEN_EXPIRE_MINUTES', cast=int, default=30)
+
+# Database connection pool
+DB_POOL_SIZE = config('DB_POOL_SIZE', cast=int, default=5)
+DB_MAX_OVERFLOW = config('DB_MAX_OVERFLOW', cast=int, default=10)
+DB_POOL_PRE_PING = config('DB_POOL_PRE_PING', cast=bool, default=True)
+DB_POOL_RECYCLE_SECONDS = config('DB_POOL_RECYCLE_SECONDS', cast=int, default=1800)
+DB_ECHO = config('DB_ECHO', cast=bool, default=False)
+
+# Startup readiness wait (python -m shared.ready), run before the server starts
+DB_READY_TIMEOUT_SECONDS = config('DB_READY_TIMEOUT_SECONDS', cast=int, default=60)
+DB_READY_INTERVAL_SECONDS = config('DB_READY_INTERVAL_SECONDS', cast=float, default=1.0)
+
+# Password hashing (bcrypt runs in a bounded worker pool off the event loop)
+BCRYPT_ROUNDS = config('BCRYPT_ROUNDS', cast=int, default=12)
+HASH_WORKERS = config('HASH_WORKERS', cast=int, default=4)
+HASH_MAX_PENDING = config('HASH_MAX_PENDING', cast=int, default=64)  # queued + running before 503
+HASH_RETRY_AFTER_SECONDS = config('HASH_RETRY_AFTER_SECONDS', cast=int, default=1)
+
+# /me: 'claims' answers from the verified token alone, 'db' always looks the user up
+ME_SOURCE = config('ME_SOURCE', default='claims')
+# opt-in LRU of user rows for db lookups (0 disables)
+USER_CACHE_SIZE = config('USER_CACHE_SIZE', cast=int, default=0)
+USER_CACHE_TTL_SECONDS = config('USER_CACHE_TTL_SECONDS', cast=int, default=60)
+
+# Refresh tokens and revocation
+REFRESH_TOKEN_EXPIRE_DAYS = config('REFRESH_TOKEN_EXPIRE_DAYS', cast=int, default=14)
+REVOCATION_BUCKET_SECONDS = config('REVOCATION_BUCKET_SECONDS', cast=int, default=3600)
+REVOCATION_SYNC_SECONDS = config('REVOCATION_SYNC_SECONDS', cast=int, default=10)
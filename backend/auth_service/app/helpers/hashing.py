@@ -0,0 +1,76 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Callable, TypeVar
+from fastapi import HTTPException, status
+from .config import HASH_WORKERS, HASH_MAX_PENDING, HASH_RETRY_AFTER_SECONDS
+from .metrics import HASH_DURATION, HASH_QUEUE_WAIT, HASH_REJECTED
+
+T = TypeVar("T")
+
+
+class HashingPool:
+
+    """
+    Size-limited thread pool for bcrypt. bcrypt releases the GIL, so a few threads keep
+    hashing off the event loop without blocking /me. Once `max_pending` calls are queued
+    or running, new ones are refused with 503 instead of piling up behind the pool.
+    """
+
+    def __init__(self, workers: int, max_pending: int, retry_after: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.retry_after = retry_after
+        self.pending = 0
+        self.rejected = 0
+        self._executor: ThreadPoolExecutor | None = None
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        # created lazily so a pre-forked worker never inherits another process's threads
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        return self._executor
+
+    async def run(self, func: Callable[..., T], *args) -> T:
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            HASH_REJECTED.inc()
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many password operations in progress, try again shortly",
+                headers={"Retry-After": str(self.retry_after)},
+            )
+
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), partial(self._timed, func, time.perf_counter(), *args))
+        finally:
+            self.pending -= 1
+
+    @staticmethod
+    def _timed(func: Callable[..., T], queued: float, *args) -> T:
+        # runs on the pool thread
+        started = time.perf_counter()
+        HASH_QUEUE_WAIT.observe(started - queued)
+        try:
+            return func(*args)
+        finally:
+            HASH_DURATION.labels(func.__name__).observe(time.perf_counter() - started)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "pending": self.pending,
+            "rejected": self.rejected,
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+hashing_pool = HashingPool(HASH_WORKERS, HASH_MAX_PENDING, HASH_RETRY_AFTER_SECONDS)
@@ -0,0 +1,17 @@
+"""
+Prometheus metrics only the auth service has. The request, SQL and pool metrics, the
+middleware and /metrics rendering are shared with the meal service (backend/shared/metrics.py).
+"""
+from prometheus_client import Counter, Histogram
+
+
+# bcrypt runs in HashingPool; queue wait is the time a call spends waiting for a free thread
+HASH_DURATION = Histogram(
+    "bcrypt_duration_seconds", "Time spent in bcrypt", ["operation"],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+HASH_QUEUE_WAIT = Histogram(
+    "bcrypt_queue_wait_seconds", "Time bcrypt calls waited for a pool thread",
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+HASH_REJECTED = Counter("bcrypt_rejected_total", "bcrypt calls refused because the pool queue was full")
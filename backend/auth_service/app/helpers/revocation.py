@@ -0,0 +1,117 @@
+import asyncio
+import logging
+import time
+from typing import Optional
+from sqlmodel import select, delete
+from sqlalchemy.exc import IntegrityError
+from sqlmodel.ext.asyncio.session import AsyncSession
+from shared.revocation import RevocationList
+from ..db.models import RevokedToken
+from ..db.session import async_session
+from .config import REVOCATION_BUCKET_SECONDS, REVOCATION_SYNC_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# rows per /revocations page and per sync query
+REVOCATIONS_PAGE_SIZE = 1000
+
+
+revocation_list = RevocationList(REVOCATION_BUCKET_SECONDS)
+
+
+async def revoke(session: AsyncSession, *tokens: tuple[str, int]) -> bool:
+
+    """
+    Persists the revocation of every (jti, exp) in `tokens` in one transaction and applies
+    them to this process straight away. Other workers (and meal_service) pick them up on
+    their next sync. Returns False, revoking none of them, if any was already revoked, here
+    or by another request, so a caller spending a single-use token can tell it lost the race.
+    Either way the session's objects are expired afterwards.
+    """
+    if any(revocation_list.is_revoked(jti, exp) for jti, exp in tokens):
+        return False
+
+    session.add_all(RevokedToken(jti=jti, expires_at=exp) for jti, exp in tokens)
+    try:
+        await session.commit()
+    except IntegrityError:
+        # already revoked by another worker
+        await session.rollback()
+        return False
+
+    for jti, exp in tokens:
+        revocation_list.add(jti, exp)
+    return True
+
+
+async def revoked_since(session: AsyncSession, after: int) -> list[RevokedToken]:
+
+    return (await session.exec(
+        select(RevokedToken)
+        .where(RevokedToken.id > after, RevokedToken.expires_at > int(time.time()))
+        .order_by(RevokedToken.id)
+        .limit(REVOCATIONS_PAGE_SIZE)
+    )).all()
+
+
+async def load_revocations(session: AsyncSession) -> int:
+
+    """
+    Loads revocations persisted since the last load, returns how many were new.
+    """
+    loaded = 0
+    while True:
+        rows = await revoked_since(session, revocation_list.last_id)
+        for row in rows:
+            revocation_list.add(row.jti, row.expires_at)
+            revocation_list.last_id = row.id
+        loaded += len(rows)
+        if len(rows) < REVOCATIONS_PAGE_SIZE:
+            return loaded
+
+
+async def purge_expired(session: AsyncSession) -> None:
+
+    await session.exec(delete(RevokedToken).where(RevokedToken.expires_at <= int(time.time())))
+    await session.commit()
+
+
+class RevocationSync:
+
+    """
+    Background task that keeps this worker's RevocationList in step with the table.
+    """
+
+    def __init__(self, interval: int):
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        # revocations must be in place before the first request is served
+        async with async_session() as session:
+            await load_revocations(session)
+        if self.interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                async with async_session() as session:
+                    await load_revocations(session)
+                    await purge_expired(session)
+                revocation_list.expire()
+            except Exception:
+                logger.exception("revocation sync failed")
+
+
+revocation_sync = RevocationSync(REVOCATION_SYNC_SECONDS)
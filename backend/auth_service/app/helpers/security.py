@@ -1,13 +1,21 @@
 from fastapi import HTTPException
 from passlib.context import CryptContext
 from datetime import datetime,timezone,timedelta
-from .config import SECRET_KEY,ALGORITHM,ACCESS_TOKEN_EXPIRE_MINUTES
+from uuid import uuid4
+from .config import SECRET_KEY,ALGORITHM,ACCESS_TOKEN_EXPIRE_MINUTES,BCRYPT_ROUNDS,REFRESH_TOKEN_EXPIRE_DAYS
 from jose import jwt, JWTError
 secret_key = SECRET_KEY
 algorithm = ALGORITHM
 access_token_expire_minutes = ACCESS_TOKEN_EXPIRE_MINUTES
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated = "auto")
+# min/max pinned to the configured cost so needs_update flags hashes made with any other cost
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated = "auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
 
 def hash_password(password:str) -> str:
     return pwd_context.hash(password)
@@ -15,15 +23,45 @@ def hash_password(password:str) -> str:
 def verify_password(password:str,hashed:str) -> bool:
     return pwd_context.verify(password,hashed)
 
+def verify_and_rehash(password:str,hashed:str) -> tuple[bool, str | None]:
+    """
+    Verifies the password and, if the stored hash uses outdated parameters, returns a fresh hash to store.
+    Runs both bcrypt calls back to back so it only needs one trip to the hashing pool.
+    """
+    if not pwd_context.verify(password,hashed):
+        return False, None
+    if pwd_context.needs_update(hashed):
+        return True, pwd_context.hash(password)
+    return True, None
+
 
 def create_access_token(data:dict,expires_delta:timedelta |None = None):
     to_encode = data.copy()
     expire = datetime.now(timezone.utc) + (expires_delta or timedelta(minutes=access_token_expire_minutes))
-    to_encode.update({"exp":expire})
+    to_encode.update({"exp":expire,"jti":uuid4().hex,"typ":"access"})
     return jwt.encode(to_encode,secret_key,algorithm=algorithm)
 
 
-def decode_access_token(token:str):
+def create_refresh_token(user_id:int) -> str:
+    # long-lived, only accepted by /refresh
+    expire = datetime.now(timezone.utc) + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+    to_encode = {"sub":str(user_id),"exp":expire,"jti":uuid4().hex,"typ":"refresh"}
+    return jwt.encode(to_encode,secret_key,algorithm=algorithm)
+
+
+def user_claims(user) -> dict:
+    """
+    Claims embedded in access tokens so /me can answer without a database lookup.
+    """
+    return {
+        "sub": str(user.id),
+        "email": user.email,
+        "created_at": user.created_at.isoformat(),
+        "updated_at": user.updated_at.isoformat(),
+    }
+
+
+def _decode_token(token:str):
 
     try:
         payload = jwt.decode(token,secret_key,algorithms=algorithm)
@@ -33,4 +71,19 @@ def decode_access_token(token:str):
        return None
 
 
+def decode_access_token(token:str):
+    payload = _decode_token(token)
+    # tokens issued before refresh tokens existed carry no typ and are access tokens
+    if payload is None or payload.get("typ", "access") != "access":
+        return None
+    return payload
+
+
+def decode_refresh_token(token:str):
+    payload = _decode_token(token)
+    if payload is None or payload.get("typ") != "refresh":
+        return None
+    return payload
+
+
 
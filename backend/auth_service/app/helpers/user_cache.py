@@ -0,0 +1,67 @@
+import time
+from collections import OrderedDict
+from typing import Optional
+from sqlalchemy import event
+from ..db.models import UserModel, GetUser
+from .config import USER_CACHE_SIZE, USER_CACHE_TTL_SECONDS
+
+
+class UserCache:
+
+    """
+    Bounded LRU of user id -> GetUser, so /me can skip the database for recently seen users.
+    Entries expire after `ttl` seconds and are dropped as soon as the row is updated or deleted.
+    """
+
+    def __init__(self, maxsize: int, ttl: int):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[int, tuple[GetUser, float]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id: int) -> Optional[GetUser]:
+        entry = self._entries.get(user_id)
+
+        if entry is None:
+            self.misses += 1
+            return None
+
+        user, expires_at = entry
+        if expires_at <= time.time():
+            del self._entries[user_id]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(user_id)
+        self.hits += 1
+        return user
+
+    def set(self, user: UserModel) -> None:
+        if self.maxsize <= 0:
+            return
+
+        self._entries[user.id] = (GetUser.model_validate(user), time.time() + self.ttl)
+        self._entries.move_to_end(user.id)
+
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: int) -> None:
+        self._entries.pop(user_id, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+user_cache = UserCache(USER_CACHE_SIZE, USER_CACHE_TTL_SECONDS)
+
+
+# flushes of a changed or deleted user evict it; other worker processes rely on the TTL
+@event.listens_for(UserModel, "after_update")
+@event.listens_for(UserModel, "after_delete")
+def _invalidate_user(mapper, connection, target: UserModel) -> None:
+    user_cache.invalidate(target.id)
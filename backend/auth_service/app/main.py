@@ -1,13 +1,20 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from .api.auth_routes import router as auth_router
 from contextlib import asynccontextmanager
-from .db.session import init_db
+from .db.session import engine
+from .helpers.hashing import hashing_pool
+from .helpers.user_cache import user_cache
+from .helpers.revocation import revocation_list, revocation_sync
+from shared.metrics import MetricsMiddleware, StatsCollector, instrument_engine, register_collector, render_metrics
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # before app startup
-    init_db()
+    # schema changes are applied beforehand by `alembic upgrade head` (see docker-compose)
+    await revocation_sync.start()
     yield
+    await revocation_sync.stop()
+    hashing_pool.shutdown()
+    await engine.dispose()
 
 
 app = FastAPI(
@@ -22,6 +29,10 @@ app = FastAPI(
 
 app.include_router(auth_router,prefix = "/api/auth", tags=["auth"])
 
+app.add_middleware(MetricsMiddleware, routes=app.routes)
+
+instrument_engine(engine)
+
 
 
 @app.get("/health")
@@ -29,3 +40,26 @@ async def health_check():
     return {"status":"ok","service":"auth"}
 
 
+def service_stats() -> dict:
+    return {
+        "hashing": hashing_pool.stats(),
+        "user_cache": {"size": len(user_cache), "hits": user_cache.hits, "misses": user_cache.misses},
+        "revocations": {"size": len(revocation_list), "last_id": revocation_list.last_id},
+    }
+
+
+# the /stats numbers, as gauges (auth_hashing_pending is the bcrypt queue depth)
+register_collector(StatsCollector(auth=service_stats))
+
+
+@app.get("/stats")
+async def stats():
+    return service_stats()
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    body, media_type = render_metrics()
+    return Response(body, media_type=media_type)
+
+
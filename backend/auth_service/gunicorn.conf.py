@@ -0,0 +1,16 @@
+"""
+Production server: gunicorn managing uvicorn workers. Picked up from the working directory,
+
+    python -m shared.ready && gunicorn app.main:app
+
+(the image's default command). The common settings and hooks are in shared/gunicorn_conf.py;
+note each worker also runs HASH_WORKERS bcrypt threads.
+"""
+import decouple
+from shared.gunicorn_conf import *  # noqa: F401,F403
+from shared.gunicorn_conf import reset_multiproc_dir
+
+
+bind = f"0.0.0.0:{decouple.config('PORT', default=8000)}"
+
+reset_multiproc_dir("/tmp/prometheus_auth")
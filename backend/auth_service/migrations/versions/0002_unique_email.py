@@ -0,0 +1,30 @@
+"""unique index on usermodel.email
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 00:00:01
+
+register and login both look users up by email.
+Fails if the table already holds duplicate emails; those rows must be merged first.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    indexes = sa.inspect(op.get_bind()).get_indexes("usermodel")
+    if not any(index["name"] == "ix_usermodel_email" for index in indexes):
+        op.create_index("ix_usermodel_email", "usermodel", ["email"], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_usermodel_email", table_name="usermodel")
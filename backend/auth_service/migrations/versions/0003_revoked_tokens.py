@@ -0,0 +1,38 @@
+"""revokedtoken table
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 00:00:02
+
+Persists revoked access/refresh token ids so they survive restarts.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "revokedtoken",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("jti", sa.String(), nullable=False),
+        sa.Column("expires_at", sa.Integer(), nullable=False),
+        sa.Column("revoked_at", sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_revokedtoken_jti", "revokedtoken", ["jti"], unique=True)
+    op.create_index("ix_revokedtoken_expires_at", "revokedtoken", ["expires_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_revokedtoken_expires_at", table_name="revokedtoken")
+    op.drop_index("ix_revokedtoken_jti", table_name="revokedtoken")
+    op.drop_table("revokedtoken")
@@ -0,0 +1,52 @@
+import os
+import sys
+
+# backend/, for the `shared` package the images copy next to `app`
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+
+# set before anything imports the app: a throwaway database and cheap hashes
+os.environ["DATABASE_URL"] = "sqlite://"
+os.environ["SECRET_KEY"] = "test"
+os.environ["BCRYPT_ROUNDS"] = "4"
+os.environ["REVOCATION_SYNC_SECONDS"] = "0"
+
+import httpx
+import pytest
+from sqlmodel import SQLModel
+
+from app.main import app
+from app.db.session import engine
+from app.helpers.revocation import revocation_list
+from app.helpers.user_cache import user_cache
+
+
+CREDENTIALS = {"email": "user@example.com", "password": "correct horse"}
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+async def client():
+    # every test starts from empty tables and no revocations in memory
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.drop_all)
+        await conn.run_sync(SQLModel.metadata.create_all)
+    revocation_list._buckets.clear()
+    revocation_list.last_id = 0
+    user_cache.clear()
+
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test/api/auth") as client:
+            yield client
+
+
+@pytest.fixture
+async def tokens(client):
+    # a registered user's access and refresh tokens
+    await client.post("/register", json=CREDENTIALS)
+    response = await client.post("/login", json=CREDENTIALS)
+    assert response.status_code == 200
+    return response.json()
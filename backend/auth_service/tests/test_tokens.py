@@ -0,0 +1,68 @@
+import asyncio
+
+import pytest
+
+from app.helpers.revocation import revocation_list
+
+
+pytestmark = pytest.mark.anyio
+
+
+def bearer(token: str) -> dict:
+    return {"Authorization": f"Bearer {token}"}
+
+
+async def test_refresh_rotates_the_pair(client, tokens):
+    response = await client.post("/refresh", json={"refresh_token": tokens["refresh_token"]})
+
+    assert response.status_code == 200
+    assert response.json()["refresh_token"] != tokens["refresh_token"]
+    assert (await client.get("/me", headers=bearer(response.json()["access_token"]))).status_code == 200
+
+
+async def test_replayed_refresh_token_is_rejected(client, tokens):
+    assert (await client.post("/refresh", json={"refresh_token": tokens["refresh_token"]})).status_code == 200
+
+    response = await client.post("/refresh", json={"refresh_token": tokens["refresh_token"]})
+
+    assert response.status_code == 401
+    assert "access_token" not in response.json()
+
+
+async def test_replay_revoked_by_another_worker_is_rejected(client, tokens):
+    # this worker hasn't synced the revocation yet, so only the table knows
+    assert (await client.post("/refresh", json={"refresh_token": tokens["refresh_token"]})).status_code == 200
+    revocation_list._buckets.clear()
+
+    response = await client.post("/refresh", json={"refresh_token": tokens["refresh_token"]})
+
+    assert response.status_code == 401
+
+
+async def test_concurrent_refresh_mints_one_pair(client, tokens):
+    responses = await asyncio.gather(*(
+        client.post("/refresh", json={"refresh_token": tokens["refresh_token"]}) for _ in range(3)
+    ))
+
+    assert sorted(response.status_code for response in responses) == [200, 401, 401]
+
+
+async def test_logout_revokes_both_tokens(client, tokens):
+    response = await client.post("/logout", headers=bearer(tokens["access_token"]), json={"refresh_token": tokens["refresh_token"]})
+
+    assert response.status_code == 204
+    assert (await client.get("/me", headers=bearer(tokens["access_token"]))).status_code == 401
+    assert (await client.post("/refresh", json={"refresh_token": tokens["refresh_token"]})).status_code == 401
+
+
+@pytest.mark.parametrize("synced", [True, False], ids=["known-here", "table-only"])
+async def test_failed_logout_leaves_access_token_valid(client, tokens, synced):
+    # the refresh token was already spent, so the logout fails and must revoke nothing
+    refreshed = (await client.post("/refresh", json={"refresh_token": tokens["refresh_token"]})).json()
+    if not synced:
+        revocation_list._buckets.clear()
+
+    response = await client.post("/logout", headers=bearer(refreshed["access_token"]), json={"refresh_token": tokens["refresh_token"]})
+
+    assert response.status_code == 401
+    assert (await client.get("/me", headers=bearer(refreshed["access_token"]))).status_code == 200
@@ -0,0 +1,78 @@
+"""
+Load scenarios for the auth service, run in-process over ASGI.
+
+    cd backend && python benchmarks/auth_load.py --users 20 --logins 200 --requests 1000
+
+register creates --users accounts (one bcrypt hash each), login signs them in --logins times
+(one bcrypt verify each) and me calls /me --requests times with their tokens. Prints one JSON
+object per scenario. Passwords are hashed with BCRYPT_ROUNDS from the environment, so lower
+it to measure everything but bcrypt.
+
+Runs against DATABASE_URL, an in-memory SQLite DB by default. Its tables are dropped and
+recreated first, so only point it at a scratch PostgreSQL database. On SQLite, register runs
+one request at a time since every session shares the single connection.
+"""
+import argparse
+import asyncio
+import os
+import random
+
+from harness import asgi_client, emit, environment, reset_database, run_scenario, use_service
+from datagen import generate
+
+
+async def main(args) -> None:
+
+    use_service("auth_service", args.database_url)
+
+    from sqlmodel import SQLModel
+    from app.main import app
+    from app.db.session import engine
+    from app.helpers.config import BCRYPT_ROUNDS, HASH_WORKERS, ME_SOURCE
+
+    labels = {
+        "service": "auth",
+        **environment(os.environ["DATABASE_URL"]),
+        "bcrypt_rounds": BCRYPT_ROUNDS,
+        "hash_workers": HASH_WORKERS,
+        "me_source": ME_SOURCE,
+    }
+    credentials = [{"email": user.email, "password": user.password} for user in generate(args.users, 0, 0, args.seed)]
+    rng = random.Random(args.seed)
+    logins = [rng.randrange(args.users) for _ in range(args.logins)]
+    lookups = [rng.randrange(args.users) for _ in range(args.requests)]
+    tokens: list[dict] = [{} for _ in credentials]
+
+    await reset_database(engine, SQLModel.metadata)
+    async with app.router.lifespan_context(app):
+        async with asgi_client(app) as client:
+
+            async def sign_in(user: int):
+                response = await client.post("/api/auth/login", json=credentials[user])
+                if response.status_code == 200:
+                    tokens[user] = {"Authorization": "Bearer " + response.json()["access_token"]}
+                return response
+
+            register_concurrency = 1 if engine.dialect.name == "sqlite" else args.concurrency
+            emit(await run_scenario(
+                "register", lambda i: client.post("/api/auth/register", json=credentials[i]),
+                args.users, register_concurrency, engine, **labels,
+            ))
+            emit(await run_scenario("login", lambda i: sign_in(logins[i]), args.logins, args.concurrency, engine, **labels))
+
+            # users that never logged in above are signed in untimed
+            for user, headers in enumerate(tokens):
+                if not headers:
+                    await sign_in(user)
+            emit(await run_scenario("me", lambda i: client.get("/api/auth/me", headers=tokens[lookups[i]]), args.requests, args.concurrency, engine, **labels))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", help="defaults to $DATABASE_URL, else in-memory SQLite")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=1000, help="/me calls")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=1)
+    asyncio.run(main(parser.parse_args()))
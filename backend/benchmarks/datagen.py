@@ -0,0 +1,155 @@
+"""
+Synthetic, seeded data for the benchmarks: users, meals and recipes in the shape the meal
+service accepts (BulkMeal / CreateRecipe, ingredients as Ingredient with UnitEnum units).
+
+    from datagen import generate
+    dataset = generate(users=10, meals=200, recipes=100, seed=1)
+
+The same arguments always give the same data. Nothing here imports a service, so both
+benchmark processes can use it.
+"""
+import random
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+
+
+# name, unit (a UnitEnum value) and a typical per-recipe quantity range
+PANTRY = [
+    ("flour", "gm", (50, 500)),
+    ("sugar", "gm", (10, 200)),
+    ("brown rice", "gm", (75, 300)),
+    ("basmati rice", "gm", (75, 300)),
+    ("spaghetti", "gm", (80, 400)),
+    ("rolled oats", "gm", (40, 120)),
+    ("chicken breast", "gm", (150, 600)),
+    ("ground beef", "gm", (200, 500)),
+    ("salmon fillet", "gm", (120, 400)),
+    ("tofu", "gm", (150, 400)),
+    ("chickpeas", "gm", (100, 400)),
+    ("red lentils", "gm", (80, 250)),
+    ("cheddar", "gm", (30, 150)),
+    ("parmesan", "gm", (10, 60)),
+    ("butter", "gm", (10, 120)),
+    ("spinach", "gm", (50, 250)),
+    ("broccoli", "gm", (100, 400)),
+    ("mushrooms", "gm", (100, 300)),
+    ("potatoes", "kg", (0.5, 2)),
+    ("carrots", "kg", (0.25, 1)),
+    ("milk", "ml", (100, 500)),
+    ("coconut milk", "ml", (200, 400)),
+    ("vegetable stock", "l", (0.5, 2)),
+    ("chicken stock", "l", (0.5, 1.5)),
+    ("olive oil", "tbsp", (1, 4)),
+    ("soy sauce", "tbsp", (1, 3)),
+    ("honey", "tbsp", (1, 3)),
+    ("lemon juice", "tbsp", (1, 3)),
+    ("salt", "tsp", (0.25, 2)),
+    ("black pepper", "tsp", (0.25, 1)),
+    ("cumin", "tsp", (0.5, 2)),
+    ("paprika", "tsp", (0.5, 2)),
+    ("cinnamon", "tsp", (0.25, 1)),
+    ("baking powder", "tsp", (1, 3)),
+    ("yogurt", "cup", (0.5, 2)),
+    ("chopped tomatoes", "cup", (1, 3)),
+    ("frozen peas", "cup", (0.5, 2)),
+    ("eggs", "pcs", (1, 6)),
+    ("onion", "pcs", (1, 3)),
+    ("garlic cloves", "pcs", (1, 6)),
+    ("bell pepper", "pcs", (1, 3)),
+    ("lime", "pcs", (1, 2)),
+    ("avocado", "pcs", (1, 2)),
+    ("banana", "pcs", (1, 3)),
+]
+
+DISHES = ["curry", "stir fry", "salad", "soup", "bake", "bowl", "pasta", "tacos", "omelette", "porridge", "stew", "wraps"]
+STYLES = ["quick", "spicy", "weeknight", "lemony", "smoky", "creamy", "herby", "one-pan", "summer", "hearty"]
+MEAL_NAMES = ["breakfast", "brunch", "lunch", "snack", "dinner", "supper"]
+STEPS = [
+    "Chop the {a} and the {b}.",
+    "Warm the {a} in a large pan over medium heat.",
+    "Add the {b} and cook for {n} minutes, stirring now and then.",
+    "Season with the {a} and simmer for {n} minutes.",
+    "Whisk the {a} into the {b} until smooth.",
+    "Bake at 200C for {n} minutes.",
+    "Serve topped with the {b}.",
+]
+
+
+@dataclass
+class UserData:
+
+    """
+    One user's meals, ready for POST /api/meals/bulk, plus the links bulk import cannot express.
+    Recipes are created inline under their first meal; `links` holds every further
+    (meal index, recipe index) pair, recipe indexes following the order bulk import returns ids in.
+    """
+
+    email: str
+    password: str
+    meals: list[dict] = field(default_factory=list)
+    links: list[tuple[int, int]] = field(default_factory=list)
+
+    @property
+    def recipe_count(self) -> int:
+        return sum(len(meal["recipes"]) for meal in self.meals)
+
+
+def ingredients(rng: random.Random, count: int) -> list[dict]:
+    return [
+        {"name": name, "quantity": round(rng.uniform(low, high), 2), "unit": unit}
+        for name, unit, (low, high) in rng.sample(PANTRY, count)
+    ]
+
+
+def recipe(rng: random.Random) -> dict:
+
+    items = ingredients(rng, rng.randint(3, 12))
+    names = [item["name"] for item in items]
+    steps = [
+        rng.choice(STEPS).format(a=rng.choice(names), b=rng.choice(names), n=rng.randint(2, 40))
+        for _ in range(rng.randint(3, 8))
+    ]
+    return {
+        "title": f"{rng.choice(STYLES)} {names[0]} {rng.choice(DISHES)}",
+        "ingredients": items,
+        "instructions": " ".join(steps),
+        "calories": round(rng.uniform(150, 950), 1),
+    }
+
+
+def user_data(rng: random.Random, index: int, meal_count: int, recipe_count: int, start: datetime) -> UserData:
+
+    user = UserData(email=f"bench{index}@example.com", password=f"bench-password-{index}")
+    user.meals = [
+        {
+            "name": rng.choice(MEAL_NAMES),
+            "date": (start + timedelta(days=day // 3, hours=8 + 5 * (day % 3))).isoformat(),
+            "recipes": [],
+        }
+        for day in range(meal_count)
+    ]
+    if not meal_count:
+        return user
+
+    # every recipe is created under a random home meal, then meals are topped up to 1-4 recipes
+    for _ in range(recipe_count):
+        user.meals[rng.randrange(meal_count)]["recipes"].append(recipe(rng))
+
+    # bulk import returns recipe ids meal by meal, so that order is the recipe index
+    home_of = [meal for meal, data in enumerate(user.meals) for _ in data["recipes"]]
+    for meal, data in enumerate(user.meals):
+        wanted = rng.randint(1, 4) - len(data["recipes"])
+        if wanted > 0 and recipe_count:
+            for position in rng.sample(range(recipe_count), min(wanted, recipe_count)):
+                if home_of[position] != meal:
+                    user.links.append((meal, position))
+    return user
+
+
+def generate(users: int, meals: int, recipes: int, seed: int = 1, start: datetime = datetime(2026, 1, 1)) -> list[UserData]:
+
+    """
+    `users` users with `meals` meals and `recipes` recipes each.
+    """
+    rng = random.Random(seed)
+    return [user_data(rng, index, meals, recipes, start) for index in range(users)]
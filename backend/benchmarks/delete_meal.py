@@ -0,0 +1,110 @@
+"""
+Times DELETE /api/meals/{meal_id} for meals with many recipes, against the old
+per-link loop (one SELECT + DELETE per link) kept here as a baseline.
+
+    cd backend && python benchmarks/delete_meal.py --recipes 100 250 --runs 5
+
+Runs in-process against DATABASE_URL (defaults to an in-memory SQLite DB).
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+from harness import use_service
+
+use_service("meal_service")
+
+import httpx
+from jose import jwt
+from sqlmodel import select
+
+from app.main import app
+from app.db.models import MealModel, MealRecipeLink, RecipeModel
+from shared.query_counter import QueryCounter
+from app.db.session import async_session, engine, init_db
+from app.helpers.config import SECRET_KEY, ALGORITHM
+
+
+USER_ID = 1
+HEADERS = {"Authorization": "Bearer " + jwt.encode({"sub": str(USER_ID), "exp": int(time.time()) + 3600}, SECRET_KEY, algorithm=ALGORITHM)}
+
+
+async def seed_meal(client: httpx.AsyncClient, recipe_count: int) -> int:
+
+    meal = {
+        "name": "benchmark",
+        "recipes": [
+            {"title": f"recipe {i}", "calories": 100, "ingredients": [{"name": "salt", "quantity": 1, "unit": "tsp"}]}
+            for i in range(recipe_count)
+        ],
+    }
+    response = await client.post("/api/meals/bulk", headers=HEADERS, json=[meal])
+    response.raise_for_status()
+    return response.json()["meal_ids"][0]
+
+
+async def delete_per_link(meal_id: int) -> None:
+
+    # The pre-set-based implementation, kept for comparison
+    async with async_session() as session:
+        meal = await session.get(MealModel, meal_id)
+        links = (await session.exec(select(MealRecipeLink).where(MealRecipeLink.meal_id == meal_id))).all()
+        for link in links:
+            await session.delete(link)
+            remaining_links = (await session.exec(select(MealRecipeLink).where(MealRecipeLink.recipe_id == link.recipe_id))).all()
+            if not remaining_links:
+                recipe = await session.get(RecipeModel, link.recipe_id)
+                if recipe:
+                    await session.delete(recipe)
+        await session.delete(meal)
+        await session.commit()
+
+
+async def delete_set_based(client: httpx.AsyncClient, meal_id: int) -> None:
+
+    response = await client.delete(f"/api/meals/{meal_id}", headers=HEADERS)
+    assert response.status_code == 204, response.text
+
+
+async def measure(client: httpx.AsyncClient, recipe_count: int, runs: int, mode: str) -> dict:
+
+    timings, queries = [], []
+    for _ in range(runs):
+        meal_id = await seed_meal(client, recipe_count)
+        with QueryCounter(engine) as counter:
+            started = time.perf_counter()
+            if mode == "set_based":
+                await delete_set_based(client, meal_id)
+            else:
+                await delete_per_link(meal_id)
+            timings.append((time.perf_counter() - started) * 1000)
+        queries.append(counter.count)
+
+    return {
+        "mode": mode,
+        "recipes": recipe_count,
+        "runs": runs,
+        "median_ms": round(statistics.median(timings), 2),
+        "max_ms": round(max(timings), 2),
+        "queries": max(queries),
+    }
+
+
+async def main(recipe_counts: list[int], runs: int) -> None:
+
+    await init_db()
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://benchmark") as client:
+            for recipe_count in recipe_counts:
+                for mode in ("per_link", "set_based"):
+                    print(json.dumps(await measure(client, recipe_count, runs, mode)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--recipes", type=int, nargs="+", default=[100, 500])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(main(args.recipes, args.runs))
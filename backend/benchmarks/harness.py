@@ -0,0 +1,124 @@
+"""
+In-process load harness shared by meal_load.py and auth_load.py.
+
+Requests go straight into the FastAPI app through httpx's ASGI transport, so results measure
+the service (routing, auth, SQL, serialization) without sockets or a server process.
+Each scenario reports one JSON object: throughput, latency percentiles, SQL statements
+per request and status counts.
+"""
+import asyncio
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from collections import Counter
+from typing import Awaitable, Callable, Optional
+
+import httpx
+
+
+BACKEND = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+# backend/, for the `shared` package both services import
+sys.path.insert(0, BACKEND)
+from shared.query_counter import QueryCounter
+
+
+def use_service(name: str, database_url: Optional[str] = None) -> None:
+
+    """
+    Puts backend/<name> on sys.path, so `import app` picks that service, and sets the env
+    its config needs. Must run before anything imports `app`.
+    """
+    if database_url:
+        os.environ["DATABASE_URL"] = database_url
+    os.environ.setdefault("DATABASE_URL", "sqlite://")
+    os.environ.setdefault("SECRET_KEY", "benchmark")
+    sys.path.insert(0, os.path.join(BACKEND, name))
+
+
+def database_label(url: str) -> str:
+    return url.split("://", 1)[0].split("+", 1)[0] or "unknown"
+
+
+async def reset_database(engine, metadata) -> None:
+
+    # every benchmark starts from empty tables; point DATABASE_URL at a scratch database
+    async with engine.begin() as conn:
+        await conn.run_sync(metadata.drop_all)
+        await conn.run_sync(metadata.create_all)
+
+
+def asgi_client(app, base_url: str = "http://bench") -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url=base_url, timeout=None)
+
+
+def percentile(ordered: list[float], fraction: float) -> float:
+    # nearest rank
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))]
+
+
+async def run_scenario(
+    name: str,
+    send: Callable[[int], Awaitable[httpx.Response]],
+    requests: int,
+    concurrency: int,
+    engine,
+    **labels,
+) -> dict:
+
+    """
+    Calls send(0) ... send(requests - 1) from `concurrency` workers and summarizes the run.
+    Non-2xx/3xx responses count as errors but still take part in the timings.
+    """
+    latencies: list[float] = []
+    statuses: Counter = Counter()
+    next_index = iter(range(requests))
+
+    async def worker():
+        for index in next_index:
+            started = time.perf_counter()
+            response = await send(index)
+            latencies.append(time.perf_counter() - started)
+            statuses[response.status_code] += 1
+
+    with QueryCounter(engine) as statements:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(max(1, min(concurrency, requests)))))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    done = len(latencies)
+    return {
+        "scenario": name,
+        **labels,
+        "requests": done,
+        "concurrency": concurrency,
+        "seconds": round(elapsed, 4),
+        "throughput_rps": round(done / elapsed, 1) if elapsed else None,
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 3) if done else None,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "max_ms": round(latencies[-1] * 1000, 3) if done else None,
+        "queries_per_request": round(statements.count / done, 2) if done else None,
+        "statuses": {str(code): count for code, count in sorted(statuses.items())},
+        "errors": sum(count for code, count in statuses.items() if code >= 400),
+    }
+
+
+def environment(database_url: str) -> dict:
+    return {
+        "database": database_label(database_url),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def emit(result: dict) -> None:
+    # one JSON object per line, collected by run.py
+    print(json.dumps(result), flush=True)
@@ -0,0 +1,132 @@
+"""
+Compares aggregate queries over recipe ingredients stored as json (before migration 0006)
+and as jsonb (after), on 100k generated recipes by default.
+
+    cd backend && DATABASE_URL=postgresql://... python benchmarks/ingredients_jsonb.py --recipes 100000 --runs 5
+
+Needs PostgreSQL. Works in two scratch tables (bench_recipe_json / bench_recipe_jsonb)
+that are dropped afterwards; recipemodel is not touched.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+
+USERS = 100
+DISTINCT_INGREDIENTS = 500
+INGREDIENTS_PER_RECIPE = 8
+
+# {table}: scratch table, {type}: json or jsonb, {elements}: json(b)_array_elements, {doc}: the column as jsonb
+SETUP = [
+    "DROP TABLE IF EXISTS {table}",
+    "CREATE TABLE {table} (id serial PRIMARY KEY, user_id integer NOT NULL, ingredients {type})",
+    """
+    INSERT INTO {table} (user_id, ingredients)
+    SELECT i % :users + 1, (
+        SELECT json_agg(json_build_object(
+            'name', 'ingredient ' || ((i * 7 + k * 13) % :distinct),
+            'quantity', k * 25,
+            'unit', (ARRAY['gm', 'ml', 'pcs'])[k % 3 + 1]
+        ))
+        FROM generate_series(1, :per_recipe) AS k
+    )::{type}
+    FROM generate_series(1, :recipes) AS i
+    """,
+    "CREATE INDEX ix_{table}_user_id ON {table} (user_id)",
+    "CREATE INDEX ix_{table}_names ON {table} USING gin ((lower(jsonb_path_query_array({doc}, '$[*].name')::text)::jsonb))",
+    "ANALYZE {table}",
+]
+JSONB_SETUP = ["CREATE INDEX ix_{table}_ingredients ON {table} USING gin (ingredients jsonb_path_ops)"]
+
+QUERIES = {
+    # grocery list style totals for one user
+    "user_totals": """
+        SELECT item->>'name', item->>'unit', sum((item->>'quantity')::float)
+        FROM {table}, {elements}(ingredients) AS item
+        WHERE user_id = 1
+        GROUP BY 1, 2
+    """,
+    # the same over every recipe
+    "all_totals": """
+        SELECT item->>'name', item->>'unit', count(*), sum((item->>'quantity')::float)
+        FROM {table}, {elements}(ingredients) AS item
+        GROUP BY 1, 2
+    """,
+    # recipes using an ingredient in a given unit; json has to cast every row
+    "containment": """
+        SELECT count(*) FROM {table}
+        WHERE {doc} @> '[{{"name": "ingredient 42", "unit": "gm"}}]'
+    """,
+    # what /user/recipes/search runs for ingredient=
+    "names_search": """
+        SELECT count(*) FROM {table}
+        WHERE user_id = 1 AND (lower(jsonb_path_query_array({doc}, '$[*].name')::text)::jsonb) @> '["ingredient 42"]'
+    """,
+}
+
+LAYOUTS = {
+    "json": {"table": "bench_recipe_json", "type": "json", "elements": "json_array_elements", "doc": "ingredients::jsonb"},
+    "jsonb": {"table": "bench_recipe_jsonb", "type": "jsonb", "elements": "jsonb_array_elements", "doc": "ingredients"},
+}
+
+
+async def setup(conn, layout: str, recipe_count: int) -> float:
+
+    names = LAYOUTS[layout]
+    params = {"users": USERS, "distinct": DISTINCT_INGREDIENTS, "per_recipe": INGREDIENTS_PER_RECIPE, "recipes": recipe_count}
+    started = time.perf_counter()
+    for statement in SETUP + (JSONB_SETUP if layout == "jsonb" else []):
+        await conn.execute(text(statement.format(**names)), params)
+    await conn.commit()
+    return (time.perf_counter() - started) * 1000
+
+
+async def measure(conn, layout: str, query: str, runs: int) -> dict:
+
+    sql = text(QUERIES[query].format(**LAYOUTS[layout]))
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        (await conn.execute(sql)).all()
+        timings.append((time.perf_counter() - started) * 1000)
+
+    return {"layout": layout, "query": query, "runs": runs, "median_ms": round(statistics.median(timings), 2), "max_ms": round(max(timings), 2)}
+
+
+async def main(recipe_count: int, runs: int) -> None:
+
+    url = os.environ.get("DATABASE_URL", "")
+    if not url.startswith(("postgresql://", "postgres://", "postgresql+asyncpg://")):
+        sys.exit("DATABASE_URL must point at PostgreSQL")
+    url = "postgresql+asyncpg://" + url.split("://", 1)[1]
+
+    engine = create_async_engine(url)
+    try:
+        async with engine.connect() as conn:
+            for layout in LAYOUTS:
+                setup_ms = await setup(conn, layout, recipe_count)
+                size = (await conn.execute(text(f"SELECT pg_total_relation_size('{LAYOUTS[layout]['table']}')"))).scalar()
+                print(json.dumps({"layout": layout, "recipes": recipe_count, "setup_ms": round(setup_ms, 2), "bytes": size}))
+            for query in QUERIES:
+                for layout in LAYOUTS:
+                    print(json.dumps(await measure(conn, layout, query, runs)))
+            for layout in LAYOUTS:
+                await conn.execute(text(f"DROP TABLE {LAYOUTS[layout]['table']}"))
+            await conn.commit()
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--recipes", type=int, default=100_000)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(main(args.recipes, args.runs))
@@ -0,0 +1,145 @@
+"""
+Load scenarios for the meal service's hot routes, run in-process over ASGI.
+
+    cd backend && python benchmarks/meal_load.py --users 10 --meals 200 --recipes 100 --requests 1000
+
+Seeds generated data (see datagen.py) through POST /bulk and /links, then runs list_all
+(/all), get_meal (/{meal_id}), user_recipes (/user/recipes) and delete_meal (the cascade,
+last since it empties the tables). Prints one JSON object per scenario.
+On SQLite the writing scenarios (seed, delete_meal) run one request at a time: every session
+shares its single connection, so concurrent transactions would interleave.
+
+Runs against DATABASE_URL, an in-memory SQLite DB by default. Its tables are dropped and
+recreated first, so only point it at a scratch PostgreSQL database. The auth service is
+replaced by a local stand-in answering /me and /revocations from the JWT itself.
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+from urllib.parse import urlsplit
+
+from harness import asgi_client, emit, environment, reset_database, run_scenario, use_service
+from datagen import generate
+
+
+SCENARIOS = ["list_all", "get_meal", "user_recipes", "delete_meal"]
+WRITES = {"seed", "delete_meal"}
+
+
+def auth_stand_in(path_prefix: str, secret_key: str, algorithm: str):
+
+    """
+    Answers what the meal service asks the auth service, without a database:
+    /me decodes the token, /revocations never has any.
+    """
+    from jose import JWTError, jwt
+    from starlette.applications import Starlette
+    from starlette.responses import JSONResponse
+    from starlette.routing import Route
+
+    async def me(request):
+        token = request.headers.get("authorization", "").removeprefix("Bearer ")
+        try:
+            claims = jwt.decode(token, secret_key, algorithms=[algorithm])
+        except JWTError:
+            return JSONResponse({"detail": "Invalid or expired token"}, status_code=401)
+        return JSONResponse({"id": int(claims["sub"]), "email": f"bench{claims['sub']}@example.com"})
+
+    async def revocations(request):
+        return JSONResponse({"revoked": [], "last_id": int(request.query_params.get("after", 0))})
+
+    return Starlette(routes=[Route(f"{path_prefix}/me", me), Route(f"{path_prefix}/revocations", revocations)])
+
+
+async def main(args) -> None:
+
+    os.environ["AUTH_VERIFY_MODE"] = args.auth_mode
+    use_service("meal_service", args.database_url)
+
+    import httpx
+    from jose import jwt
+    from sqlmodel import SQLModel
+    from app.main import app
+    from app.db.session import engine
+    from app.helpers.auth_client import auth_client
+    from app.helpers.config import ALGORITHM, AUTH_SERVICE_URL, LINKS_MAX_PAIRS, RESPONSE_CACHE_BACKEND, SECRET_KEY
+
+    # start() keeps an existing client, so the lifespan uses this one
+    stand_in = auth_stand_in(urlsplit(AUTH_SERVICE_URL).path, SECRET_KEY, ALGORITHM)
+    auth_client._client = httpx.AsyncClient(transport=httpx.ASGITransport(app=stand_in), base_url=AUTH_SERVICE_URL)
+
+    labels = {
+        "service": "meal",
+        **environment(os.environ["DATABASE_URL"]),
+        "auth_mode": args.auth_mode,
+        "response_cache": RESPONSE_CACHE_BACKEND,
+    }
+    exp = int(time.time()) + 24 * 3600
+    headers = [
+        {"Authorization": "Bearer " + jwt.encode({"sub": str(user_id), "exp": exp}, SECRET_KEY, algorithm=ALGORITHM)}
+        for user_id in range(1, args.users + 1)
+    ]
+    dataset = generate(args.users, args.meals, args.recipes, args.seed)
+    meal_ids: list[list[int]] = [[] for _ in dataset]
+    rng = random.Random(args.seed)
+
+    def concurrency(scenario: str) -> int:
+        return 1 if scenario in WRITES and engine.dialect.name == "sqlite" else args.concurrency
+
+    await reset_database(engine, SQLModel.metadata)
+    async with app.router.lifespan_context(app):
+        async with asgi_client(app) as client:
+
+            async def seed(user: int) -> httpx.Response:
+                response = await client.post("/api/meals/bulk", headers=headers[user], json=dataset[user].meals)
+                response.raise_for_status()
+                result = response.json()
+                meal_ids[user] = result["meal_ids"]
+                pairs = [
+                    {"meal_id": result["meal_ids"][meal], "recipe_id": result["recipe_ids"][recipe]}
+                    for meal, recipe in dataset[user].links
+                ]
+                for start in range(0, len(pairs), LINKS_MAX_PAIRS):
+                    response = await client.post("/api/meals/links", headers=headers[user], json={"link": pairs[start:start + LINKS_MAX_PAIRS]})
+                    response.raise_for_status()
+                return response
+
+            seeded = await run_scenario("seed", seed, args.users, concurrency("seed"), engine, **labels)
+            seeded.update(
+                meals=sum(len(user.meals) for user in dataset),
+                recipes=sum(user.recipe_count for user in dataset),
+                links=sum(user.recipe_count + len(user.links) for user in dataset),
+            )
+            emit(seeded)
+
+            # targets are drawn up front so the timed loop only sends requests
+            users = [rng.randrange(args.users) for _ in range(args.requests)]
+            meals = [rng.choice(meal_ids[user]) if meal_ids[user] else 0 for user in users]
+            deletions = [(user, meal_id) for user in range(args.users) for meal_id in meal_ids[user]]
+            rng.shuffle(deletions)
+
+            sends = {
+                "list_all": lambda i: client.get("/api/meals/all", headers=headers[users[i]]),
+                "get_meal": lambda i: client.get(f"/api/meals/{meals[i]}", headers=headers[users[i]]),
+                "user_recipes": lambda i: client.get("/api/meals/user/recipes", headers=headers[users[i]]),
+                "delete_meal": lambda i: client.delete(f"/api/meals/{deletions[i][1]}", headers=headers[deletions[i][0]]),
+            }
+            for name in args.scenarios:
+                requests = min(args.requests, len(deletions)) if name == "delete_meal" else args.requests
+                emit(await run_scenario(name, sends[name], requests, concurrency(name), engine, **labels))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", help="defaults to $DATABASE_URL, else in-memory SQLite")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--meals", type=int, default=200, help="per user")
+    parser.add_argument("--recipes", type=int, default=100, help="per user")
+    parser.add_argument("--requests", type=int, default=1000, help="per scenario")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--auth-mode", choices=["local", "remote"], default="local", help="remote goes through the auth stand-in")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    asyncio.run(main(parser.parse_args()))
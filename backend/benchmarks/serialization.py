@@ -0,0 +1,125 @@
+"""
+Times building the GET /api/meals/{meal_id} body for meals with 1, 50 and 1000 recipes:
+the previous ORM path (selectinload, GetMeal.from_orm_with_recipes, response_model
+re-validation, jsonable_encoder + json.dumps) against rows mapped straight to dicts
+and rendered with orjson.
+
+    cd backend && python benchmarks/serialization.py --recipes 1 50 1000 --runs 20
+
+Runs in-process against DATABASE_URL (defaults to an in-memory SQLite DB).
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+from harness import use_service
+
+use_service("meal_service")
+
+import httpx
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from jose import jwt
+from pydantic import TypeAdapter
+from sqlalchemy.orm import selectinload
+from sqlmodel import select
+
+from app.main import app
+from app.db.models import MealModel, RecipeModel, GetMeal
+from app.db.rows import meal_row
+from app.db.session import async_session, init_db
+from app.helpers.config import SECRET_KEY, ALGORITHM
+from app.helpers.responses import FastJSONResponse
+
+
+USER_ID = 1
+HEADERS = {"Authorization": "Bearer " + jwt.encode({"sub": str(USER_ID), "exp": int(time.time()) + 3600}, SECRET_KEY, algorithm=ALGORITHM)}
+GET_MEAL = TypeAdapter(GetMeal)
+
+
+async def seed_meal(client: httpx.AsyncClient, recipe_count: int) -> int:
+
+    meal = {
+        "name": "benchmark",
+        "recipes": [
+            {
+                "title": f"recipe {i}",
+                "calories": 250.5,
+                "instructions": "Mix everything and simmer for twenty minutes.",
+                "ingredients": [
+                    {"name": "lentils", "quantity": 200, "unit": "gm"},
+                    {"name": "salt", "quantity": 1, "unit": "tsp"},
+                    {"name": "water", "quantity": 0.5, "unit": "l"},
+                ],
+            }
+            for i in range(recipe_count)
+        ],
+    }
+    response = await client.post("/api/meals/bulk", headers=HEADERS, json=[meal])
+    response.raise_for_status()
+    return response.json()["meal_ids"][0]
+
+
+async def render_orm(meal_id: int) -> bytes:
+
+    # The pre-orjson implementation, kept for comparison; the last three steps are what
+    # FastAPI's serialize_response does with a response_model
+    async with async_session() as session:
+        meal = (await session.exec(
+            select(MealModel)
+            .where(MealModel.id == meal_id, MealModel.user_id == USER_ID)
+            .options(selectinload(MealModel.recipes).selectinload(RecipeModel.meals))
+        )).first()
+        content = GetMeal.from_orm_with_recipes(meal).model_dump()
+
+    value = GET_MEAL.validate_python(content)
+    return JSONResponse(jsonable_encoder(GET_MEAL.dump_python(value, mode="json"))).body
+
+
+async def render_rows(meal_id: int) -> bytes:
+
+    async with async_session() as session:
+        meal = await meal_row(session, USER_ID, meal_id)
+    return FastJSONResponse(meal).body
+
+
+async def measure(meal_id: int, recipe_count: int, runs: int, mode: str) -> dict:
+
+    render = render_rows if mode == "rows_orjson" else render_orm
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        body = await render(meal_id)
+        timings.append((time.perf_counter() - started) * 1000)
+
+    return {
+        "mode": mode,
+        "recipes": recipe_count,
+        "runs": runs,
+        "median_ms": round(statistics.median(timings), 3),
+        "max_ms": round(max(timings), 3),
+        "bytes": len(body),
+    }
+
+
+async def main(recipe_counts: list[int], runs: int) -> None:
+
+    await init_db()
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://benchmark") as client:
+            for recipe_count in recipe_counts:
+                meal_id = await seed_meal(client, recipe_count)
+                # both paths must produce the same document
+                assert json.loads(await render_orm(meal_id)) == json.loads(await render_rows(meal_id))
+                for mode in ("orm_pydantic", "rows_orjson"):
+                    print(json.dumps(await measure(meal_id, recipe_count, runs, mode)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--recipes", type=int, nargs="+", default=[1, 50, 1000])
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.recipes, args.runs))
@@ -1,22 +1,81 @@
-from fastapi import APIRouter,Depends, HTTPException, Header
-from typing import List
-from sqlmodel import Session, select
-from ..db.models import MealRecipeLink,MealModel,RecipeModel,CreateMeal,UpdateMeal,GetMeal,GetMealSummary,CreateRecipe,GetRecipe,UpdateRecipe,get_utc_now
+from fastapi import APIRouter,Depends, HTTPException, Header, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from typing import List, Optional
+from datetime import date, datetime, time, timedelta
+from sqlmodel import select, delete, update
+from sqlmodel.ext.asyncio.session import AsyncSession
+from ..db.models import MealRecipeLink,MealModel,RecipeModel,CreateMeal,UpdateMeal,GetMeal,GetMealSummary,CreateRecipe,GetRecipe,GetRecipeSearchResult,UpdateRecipe,GroceryList,GetDailyRollup,DailyRollup,BulkImportResult,LinkBatch,LinkBatchResult,GetCalendar,get_utc_now,get_naive_utc_now
 from ..db.session import get_session
+from ..db.queries import delete_orphaned_recipes, recipe_summaries_by_meal, meal_range_validator, touch_meals, meal_validator, recipe_validator, list_validator
+from ..db.bulk import read_bulk_meals, import_meals, export_meals
+from ..db.rollups import refresh_days, meal_days
+from ..db.rows import MEAL_COLUMNS, RECIPE_COLUMNS, meal_row, meal_recipe_rows, recipe_rows, with_meal_ids
+from ..db.search import search_recipes
+from ..db.links import set_recipe_meals, apply_links
 import httpx
 from ..helpers.security import verify_user
+from ..helpers.config import PAGE_SIZE_DEFAULT, PAGE_SIZE_MAX, CALENDAR_MAX_DAYS, LINKS_MAX_PAIRS
+from ..helpers.conditional import ConditionalRequest, weak_etag, cache_headers, not_modified, version_etag, if_match_version
+from ..helpers.grocery import GroceryAggregator
+from ..helpers.pagination import NEXT_CURSOR_HEADER, decode_cursor, keyset_after, paginate, parse_fields
+from ..helpers.responses import FastJSONResponse
 
 router = APIRouter()
 
+# recipe fields that feed the daily rollups
+ROLLUP_FIELDS = {"calories", "ingredients"}
+
+
+async def apply_recipe_changes(session: AsyncSession, user_id: int, recipe_id: int, changes: dict, meal_ids: Optional[List[int]]) -> List[int]:
+
+    """
+    Relinks the recipe when the update carried meal_ids and refreshes the rollups its changes affect.
+    Returns the recipe's meal ids afterwards.
+    """
+    contents_changed = bool(ROLLUP_FIELDS & changes.keys())
+    if meal_ids is not None:
+        return await set_recipe_meals(session, user_id, recipe_id, meal_ids, contents_changed=contents_changed)
+
+    linked = (await session.exec(
+        select(MealRecipeLink.meal_id, MealModel.date)
+        .join(MealModel, MealModel.id == MealRecipeLink.meal_id)
+        .where(MealRecipeLink.recipe_id == recipe_id)
+        .order_by(MealRecipeLink.meal_id)
+    )).all()
+    if contents_changed:
+        await refresh_days(session, user_id, {meal_date.date() for _, meal_date in linked})
+    return [meal_id for meal_id, _ in linked]
+
+
+async def update_returning(session: AsyncSession, statement, model, version: Optional[datetime]):
+
+    """
+    Runs an UPDATE ... RETURNING built by a PATCH route, pinned to `version` (If-Match) when given.
+    Returns the updated row as a mapping, or None when nothing matched.
+    """
+    if version is not None:
+        statement = statement.where(model.updated_at == version)
+    result = await session.exec(statement.values(updated_at=get_utc_now()).execution_options(synchronize_session=False))
+    return result.mappings().first()
+
 
 
 # AUTH_SERVICE_URL = "http://auth_service:8000/api/auth"
 
 
 
+# strong, led by the row's updated_at, so a GET's or PATCH's ETag also works as the If-Match of a PATCH
+def meal_etag(meal_id: int, validator: tuple) -> str:
+    return version_etag(validator[0], "meal", meal_id, validator)
+
+
+def recipe_etag(recipe_id: int, validator: tuple) -> str:
+    return version_etag(validator[0], "recipe", recipe_id, validator)
+
+
 #Meal Creation
 @router.post('/create',response_model=GetMeal)
-async def create_meal(meal:CreateMeal,session: Session = Depends(get_session),authorization:str = Header(...)):
+async def create_meal(meal:CreateMeal,session: AsyncSession = Depends(get_session),authorization:str = Header(...)):
     
     # async with httpx.AsyncClient() as client:
     #     resp = await client.get(f"{AUTH_SERVICE_URL}/me", headers={"Authorization":authorization})
@@ -34,46 +93,204 @@ async def create_meal(meal:CreateMeal,session: Session = Depends(get_session),au
 
         user_id=user_id,
         name = meal.name,
-        date=meal.date or None,
+        date=meal.date or get_naive_utc_now(),
     )
 
     session.add(new_meal)
-    session.commit()
-    session.refresh(new_meal)
-    return new_meal
+    await refresh_days(session, user_id, {new_meal.date.date()})
+    await session.commit()
+    await session.refresh(new_meal)
+    return GetMeal(**new_meal.model_dump(), recipes=[])
 
 
-#Fetch all meals for a user
+#Fetch all meals for a user (keyset paginated over (date, id))
 @router.get('/all',response_model=List[GetMealSummary])
-async def get_all_meals(authorization:str = Header(...), session: Session = Depends(get_session)):
+async def get_all_meals(
+    authorization:str = Header(...),
+    session: AsyncSession = Depends(get_session),
+    limit: int = Query(PAGE_SIZE_DEFAULT, ge=1, le=PAGE_SIZE_MAX),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    conditional: ConditionalRequest = Depends(),
+):
 
     user_id = await verify_user(authorization)
 
-    all_meals = session.exec(
-        select(MealModel).where(MealModel.user_id == user_id)
-    ).all()
+    projection = parse_fields(fields, GetMealSummary.model_fields)
 
-    if not all_meals:
+    # ETag only: a delete can lower max(updated_at), so Last-Modified would go backwards
+    validator = await list_validator(session, user_id, MealModel)
+    if validator[0] == 0 and not cursor:
+        raise HTTPException(status_code=404, detail="No meals found")
+    etag = weak_etag("meals", user_id, limit, cursor, fields, validator)
+    if conditional.is_fresh(etag):
+        return not_modified(etag)
+    names = projection or list(GetMealSummary.model_fields)
+    columns = [MealModel.__table__.c[name] for name in dict.fromkeys(names + ["date", "id"])]
+
+    query = (
+        select(*columns)
+        .where(MealModel.user_id == user_id)
+        .order_by(MealModel.date, MealModel.id)
+        .limit(limit + 1)
+    )
+    if cursor:
+        query = query.where(keyset_after((MealModel.date, MealModel.id), decode_cursor(cursor)))
+
+    rows = (await session.exec(query)).mappings().all()
+
+    if not rows and not cursor:
         raise HTTPException(status_code=404, detail="No meals found")
-    
-    # return [GetMeal.from_orm_with_recipes(meal) for meal in all_meals]
-    return all_meals
+
+    page, next_cursor = paginate(rows, limit, ("date", "id"))
+    headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else {}
+    headers.update(cache_headers(etag))
+
+    # rows already match GetMealSummary (or the projection), so skip response_model validation
+    names = projection or list(GetMealSummary.model_fields)
+    return FastJSONResponse([{name: row[name] for name in names} for row in page], headers=headers)
+
+#Grocery list for every recipe planned between two dates (inclusive)
+@router.get('/grocery-list',response_model=GroceryList)
+async def get_grocery_list(
+    start: date = Query(..., alias="from"),
+    end: date = Query(..., alias="to"),
+    session: AsyncSession = Depends(get_session),
+    authorization: str = Header(...),
+):
+
+    user_id = await verify_user(authorization)
+
+    if end < start:
+        raise HTTPException(status_code=400, detail="'to' must not be before 'from'")
+
+    # range scan over the daily rollups, which already hold per-day ingredient totals
+    rows = await session.exec(
+        select(DailyRollup.meal_count, DailyRollup.ingredients)
+        .where(DailyRollup.user_id == user_id, DailyRollup.day >= start, DailyRollup.day <= end)
+    )
+
+    aggregator = GroceryAggregator()
+    meal_count = 0
+    for day_meal_count, ingredients in rows:
+        meal_count += day_meal_count
+        aggregator.add(ingredients)
+
+    return GroceryList(start=start, end=end, meal_count=meal_count, items=aggregator.items())
+
+
+#Calories and counts per day between two dates (inclusive)
+@router.get('/nutrition',response_model=List[GetDailyRollup])
+async def get_nutrition(
+    start: date = Query(..., alias="from"),
+    end: date = Query(..., alias="to"),
+    session: AsyncSession = Depends(get_session),
+    authorization: str = Header(...),
+):
+
+    user_id = await verify_user(authorization)
+
+    if end < start:
+        raise HTTPException(status_code=400, detail="'to' must not be before 'from'")
+
+    rows = await session.exec(
+        select(DailyRollup.day, DailyRollup.meal_count, DailyRollup.recipe_count, DailyRollup.calories)
+        .where(DailyRollup.user_id == user_id, DailyRollup.day >= start, DailyRollup.day <= end)
+        .order_by(DailyRollup.day)
+    )
+    return rows.mappings().all()
+
+
+#Meals with their recipes between two dates (inclusive), grouped by day
+@router.get('/calendar',response_model=GetCalendar)
+async def get_calendar(
+    start: date = Query(..., alias="from"),
+    end: date = Query(..., alias="to"),
+    session: AsyncSession = Depends(get_session),
+    authorization: str = Header(...),
+    conditional: ConditionalRequest = Depends(),
+):
+
+    user_id = await verify_user(authorization)
+
+    if end < start:
+        raise HTTPException(status_code=400, detail="'to' must not be before 'from'")
+    if (end - start).days >= CALENDAR_MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"Range can span at most {CALENDAR_MAX_DAYS} days")
+
+    # mealmodel.date is naive UTC, so the window is [from 00:00, day after 'to' 00:00)
+    lower = datetime.combine(start, time.min)
+    upper = datetime.combine(end + timedelta(days=1), time.min)
+
+    # unchanged weeks are answered from one aggregate query
+    etag = weak_etag(user_id, start, end, await meal_range_validator(session, user_id, lower, upper))
+    if conditional.is_fresh(etag):
+        return not_modified(etag)
+
+    meals = (await session.exec(
+        select(MealModel.id, MealModel.name, MealModel.date, MealModel.updated_at)
+        .where(MealModel.user_id == user_id, MealModel.date >= lower, MealModel.date < upper)
+        .order_by(MealModel.date, MealModel.id)
+    )).mappings().all()
+
+    recipes = await recipe_summaries_by_meal(session, [meal["id"] for meal in meals])
+
+    days = {}
+    for meal in meals:
+        days.setdefault(meal["date"].date(), []).append({**meal, "recipes": recipes.get(meal["id"], [])})
+
+    calendar = {
+        "start": start,
+        "end": end,
+        "days": [{"day": day, "meals": day_meals} for day, day_meals in days.items()],
+    }
+    return FastJSONResponse(calendar, headers=cache_headers(etag))
+
+
+#Bulk import meals with nested recipes and links (JSON array or NDJSON), in one transaction
+@router.post('/bulk',response_model=BulkImportResult,status_code=201)
+async def bulk_import_meals(request: Request, session: AsyncSession = Depends(get_session), authorization: str = Header(...)):
+
+    user_id = await verify_user(authorization)
+
+    meals = await read_bulk_meals(request)
+    result = await import_meals(session, user_id, meals)
+    await session.commit()
+
+    return result
+
+
+#Export every meal with its recipes as streamed NDJSON
+@router.get('/export')
+async def export_all_meals(authorization: str = Header(...)):
+
+    user_id = await verify_user(authorization)
+
+    return StreamingResponse(export_meals(user_id), media_type="application/x-ndjson")
+
 
 #Fetch single meal for a user
 @router.get('/{meal_id}',response_model=GetMeal)
-async def get_meal(meal_id:int, session:Session = Depends(get_session), authorization: str = Header(...)):
-    
+async def get_meal(meal_id:int, session:AsyncSession = Depends(get_session), authorization: str = Header(...), conditional: ConditionalRequest = Depends()):
+
     user_id = await verify_user(authorization)
 
-    meal = session.exec(
-        select(MealModel).where(MealModel.id == meal_id, MealModel.user_id == user_id)
-    ).first()
+    # validators come from one aggregate, so an unchanged meal never loads its recipes
+    validated = await meal_validator(session, user_id, meal_id)
+    if validated is None:
+         raise HTTPException(status_code=403, detail="Meal not found or not yours")
+
+    validator, last_modified = validated
+    etag = meal_etag(meal_id, validator)
+    if conditional.is_fresh(etag, last_modified):
+        return not_modified(etag, last_modified)
+
+    meal = await meal_row(session, user_id, meal_id)
 
     if not meal:
          raise HTTPException(status_code=403, detail="Meal not found or not yours")
 
-    
-    return GetMeal.from_orm_with_recipes(meal)
+    return FastJSONResponse(meal, headers=cache_headers(etag, last_modified))
 
 
 
@@ -82,62 +299,69 @@ async def get_meal(meal_id:int, session:Session = Depends(get_session), authoriz
 
 #Update meal details for a user
 @router.patch('/{meal_id}',response_model=GetMeal)
-async def update_meal(meal_id:int, meal_data : UpdateMeal, session: Session = Depends(get_session),authorization:str = Header(...)):
+async def update_meal(meal_id:int, meal_data : UpdateMeal, response: Response, session: AsyncSession = Depends(get_session),authorization:str = Header(...), if_match: Optional[str] = Header(None)):
 
     user_id = await verify_user(authorization)
+    version = if_match_version(if_match)
 
-    # Fetch and check ownership
-    meal = session.get(MealModel, meal_id)
-    if not meal or meal.user_id != user_id:
-        raise HTTPException(status_code=404, detail="Meal not found or not yours")
+    changes = meal_data.model_dump(exclude_unset=True)
+    owned = (MealModel.id == meal_id, MealModel.user_id == user_id)
 
-    # Update fields
-    for key, value in meal_data.model_dump(exclude_unset=True).items():
-        setattr(meal, key, value)
+    # moving the meal to another day changes two rollups, and RETURNING only sees the new date
+    old_date = None
+    if "date" in changes:
+        old_date = (await session.exec(select(MealModel.date).where(*owned).with_for_update())).first()
 
-    meal.updated_at = get_utc_now()
-    session.add(meal)
-    session.commit()
-    session.refresh(meal)
-    return GetMeal.from_orm_with_recipes(meal)
+    # ownership is part of the WHERE clause, so a miss means 404 (or 412 under If-Match)
+    meal = await update_returning(
+        session, update(MealModel).where(*owned).values(**changes).returning(*MEAL_COLUMNS), MealModel, version
+    )
+
+    if meal is None:
+        if version is None or (await session.exec(select(MealModel.id).where(*owned))).first() is None:
+            raise HTTPException(status_code=404, detail="Meal not found or not yours")
+        raise HTTPException(status_code=412, detail="Meal was modified since the If-Match version")
+
+    if old_date is not None and old_date.date() != meal["date"].date():
+        await refresh_days(session, user_id, {old_date.date(), meal["date"].date()})
+    recipes = await meal_recipe_rows(session, meal_id)
+    # read inside the transaction, so the tag describes exactly the body returned
+    validator, _ = await meal_validator(session, user_id, meal_id)
+    await session.commit()
 
+    response.headers["ETag"] = meal_etag(meal_id, validator)
+    return GetMeal(**meal, recipes=recipes)
 
-# delete a meal 
+
+# delete a meal (and any recipes left without a meal)
 @router.delete("/{meal_id}", status_code=204)
-async def delete_meal(meal_id: int,session: Session = Depends(get_session),authorization: str = Header(...)):
+async def delete_meal(meal_id: int,session: AsyncSession = Depends(get_session),authorization: str = Header(...)):
     
     user_id = await verify_user(authorization)
 
     # Fetch meal and check ownership
-    meal = session.get(MealModel, meal_id)
-    if not meal or meal.user_id != user_id:
+    meal_date = (await session.exec(
+        select(MealModel.date).where(MealModel.id == meal_id, MealModel.user_id == user_id)
+    )).first()
+    if meal_date is None:
         raise HTTPException(status_code=404, detail="Meal not found or not yours")
 
-    # Fetch all links for this meal
-    links = session.exec(
-        select(MealRecipeLink).where(MealRecipeLink.meal_id == meal_id)
-    ).all()
+    # Drop the meal's links, then whichever of those recipes no longer has a meal
+    recipe_ids = (await session.exec(
+        delete(MealRecipeLink)
+        .where(MealRecipeLink.meal_id == meal_id)
+        .returning(MealRecipeLink.recipe_id)
+        .execution_options(synchronize_session=False)
+    )).scalars().all()
 
-    for link in links:
-        # Delete the link
-        session.delete(link)
+    await delete_orphaned_recipes(session, recipe_ids)
+    # surviving recipes list one meal fewer
+    await touch_meals(session, recipe_ids=recipe_ids)
 
-        # Check if the recipe has any other links remaining
-        remaining_links = session.exec(
-            select(MealRecipeLink).where(MealRecipeLink.recipe_id == link.recipe_id)
-        ).all()
+    await session.exec(delete(MealModel).where(MealModel.id == meal_id).execution_options(synchronize_session=False))
 
-        # If no other links exist, delete the recipe
-        if not remaining_links:
-            recipe = session.get(RecipeModel, link.recipe_id)
-            if recipe:
-                session.delete(recipe)
-
-    # Finally, delete the meal itself
-    session.delete(meal)
-
-  
-    session.commit()
+    await refresh_days(session, user_id, {meal_date.date()})
+    await session.commit()
 
     return None  # 204 No Content
 
@@ -146,11 +370,11 @@ async def delete_meal(meal_id: int,session: Session = Depends(get_session),autho
 
 #Recipe Creation in a meal
 @router.post('/{meal_id}/recipe/create',response_model=GetRecipe)
-async def create_recipe_for_meal(meal_id:int, recipe:CreateRecipe, session: Session = Depends(get_session), authorization: str = Header(...)):
+async def create_recipe_for_meal(meal_id:int, recipe:CreateRecipe, session: AsyncSession = Depends(get_session), authorization: str = Header(...)):
 
     user_id = await verify_user(authorization)
 
-    meal = session.get(MealModel, meal_id)
+    meal = await session.get(MealModel, meal_id)
 
     if not meal or meal.user_id != user_id:
         raise HTTPException(status_code=404, detail="Meal not found or not yours")
@@ -167,20 +391,19 @@ async def create_recipe_for_meal(meal_id:int, recipe:CreateRecipe, session: Sess
     )
 
     session.add(new_recipe)
-    session.commit()
-    session.refresh(new_recipe)
+    await session.flush()
 
-    link = MealRecipeLink(meal_id=meal.id,recipe_id=new_recipe.id)
-    session.add(link)
-    session.commit()
+    # this meal plus any meal_ids, linked in the same transaction
+    meal_ids = await set_recipe_meals(session, user_id, new_recipe.id, [meal_id, *(recipe.meal_ids or [])], current=())
+    await session.commit()
     
     
-    return GetRecipe.from_orm_with_meals(new_recipe)
+    return GetRecipe.from_orm_with_meals(new_recipe, meal_ids)
 
 
 #Recipe Creation for a user
 @router.post('/recipe/create',response_model=GetRecipe)
-async def create_recipe_for_user(recipe:CreateRecipe, session: Session = Depends(get_session), authorization: str = Header(...)):
+async def create_recipe_for_user(recipe:CreateRecipe, session: AsyncSession = Depends(get_session), authorization: str = Header(...)):
 
     user_id = await verify_user(authorization)
 
@@ -198,42 +421,41 @@ async def create_recipe_for_user(recipe:CreateRecipe, session: Session = Depends
     )
 
     session.add(new_recipe)
-    session.commit()
-    session.refresh(new_recipe)
-
-    # link = MealRecipeLink(meal_id=meal.id,recipe_id=new_recipe.id)
-    # session.add(link)
-    # session.commit()
+    meal_ids = []
+    if recipe.meal_ids:
+        await session.flush()
+        meal_ids = await set_recipe_meals(session, user_id, new_recipe.id, recipe.meal_ids, current=())
+    await session.commit()
     
     
-    return GetRecipe.from_orm_with_meals(new_recipe)
+    return GetRecipe.from_orm_with_meals(new_recipe, meal_ids)
 
 
 #link recipe to meal
 @router.post('/{meal_id}/recipe/{recipe_id}/link',status_code= 201)
-async def link_recipe_to_meal(meal_id:int,recipe_id:int,session:Session = Depends(get_session),authorization: str = Header(...)):
+async def link_recipe_to_meal(meal_id:int,recipe_id:int,session:AsyncSession = Depends(get_session),authorization: str = Header(...)):
 
     user_id = await verify_user(authorization)
 
-    meal = session.get(MealModel, meal_id)
+    meal = await session.get(MealModel, meal_id)
 
     if not meal or meal.user_id != user_id:
         raise HTTPException(status_code=404, detail="Meal not found or not yours")
     
-    recipe = session.get(RecipeModel,recipe_id)
+    recipe = await session.get(RecipeModel,recipe_id)
 
     if not recipe or recipe.user_id != user_id:
         raise HTTPException(status_code=404, detail="Recipe not found or not yours")
 
 
     # Prevent duplicate linking
-    existing_link = session.exec(
+    existing_link = (await session.exec(
         select(MealRecipeLink).where(
 
             MealRecipeLink.meal_id == meal_id,
             MealRecipeLink.recipe_id == recipe_id
         )
-    ).first()
+    )).first()
 
     if existing_link:
         raise HTTPException(status_code=400, detail="Recipe already linked to this meal")
@@ -241,7 +463,9 @@ async def link_recipe_to_meal(meal_id:int,recipe_id:int,session:Session = Depend
     # Create link
     link = MealRecipeLink(meal_id=meal_id, recipe_id=recipe_id)
     session.add(link)
-    session.commit()
+    await touch_meals(session, [meal_id], [recipe_id])
+    await refresh_days(session, user_id, {meal.date.date()})
+    await session.commit()
 
     return {"message": f"Recipe {recipe_id} linked to meal {meal_id}"}
 
@@ -249,34 +473,51 @@ async def link_recipe_to_meal(meal_id:int,recipe_id:int,session:Session = Depend
 
 #unlink recipe to meal
 @router.delete("/{meal_id}/recipe/{recipe_id}/unlink", status_code=204)
-async def unlink_recipe_from_meal(meal_id: int, recipe_id: int, session: Session = Depends(get_session), authorization: str = Header(...)):
+async def unlink_recipe_from_meal(meal_id: int, recipe_id: int, session: AsyncSession = Depends(get_session), authorization: str = Header(...)):
     user_id = await verify_user(authorization)
 
-    meal = session.get(MealModel, meal_id)
+    meal = await session.get(MealModel, meal_id)
     if not meal or meal.user_id != user_id:
         raise HTTPException(status_code=404, detail="Meal not found or not yours")
 
-    recipe = session.get(RecipeModel, recipe_id)
+    recipe = await session.get(RecipeModel, recipe_id)
     if not recipe or recipe.user_id != user_id:
         raise HTTPException(status_code=404, detail="Recipe not found or not yours")
 
     # Remove link if exists
-    link = session.exec(
+    link = (await session.exec(
         select(MealRecipeLink).where(
             MealRecipeLink.meal_id == meal_id,
             MealRecipeLink.recipe_id == recipe_id
         )
-    ).first()
+    )).first()
 
     if not link:
         raise HTTPException(status_code=404, detail="Recipe not linked to this meal")
 
-    session.delete(link)
-    session.commit()
+    await session.delete(link)
+    await touch_meals(session, [meal_id], [recipe_id])
+    await refresh_days(session, user_id, {meal.date.date()})
+    await session.commit()
 
     return {"message": f"Recipe {recipe_id} unlinked from meal {meal_id}"}
 
 
+#link and unlink many (meal, recipe) pairs in one transaction
+@router.post('/links', response_model=LinkBatchResult)
+async def batch_links(batch: LinkBatch, session: AsyncSession = Depends(get_session), authorization: str = Header(...)):
+
+    user_id = await verify_user(authorization)
+
+    if len(batch.link) + len(batch.unlink) > LINKS_MAX_PAIRS:
+        raise HTTPException(status_code=413, detail=f"At most {LINKS_MAX_PAIRS} pairs per request")
+
+    result = await apply_links(session, user_id, batch)
+    await session.commit()
+
+    return result
+
+
 
     
 
@@ -284,135 +525,245 @@ async def unlink_recipe_from_meal(meal_id: int, recipe_id: int, session: Session
 
 # Fetch a recipe for a meal (many to many)
 @router.get("/{meal_id}/recipe/{recipe_id}", response_model=GetRecipe)
-async def get_recipe(meal_id:int, recipe_id: int,session: Session = Depends(get_session),authorization: str = Header(...)):
+async def get_recipe(meal_id:int, recipe_id: int, session: AsyncSession = Depends(get_session),authorization: str = Header(...), conditional: ConditionalRequest = Depends()):
+
 
-   
     user_id = await verify_user(authorization)
 
-    recipe = session.get(RecipeModel, recipe_id)
-    
-    if not recipe:
+    validated = await recipe_validator(session, user_id, meal_id, recipe_id)
+
+    if validated is None:
         raise HTTPException(status_code=404, detail="Recipe not found")
-    
-    if not any(meal.id == meal_id and meal.user_id == user_id for meal in recipe.meals):
+
+    validator, last_modified, linked = validated
+    if not linked:
         raise HTTPException(status_code=404, detail= "Recipe not found or not yours")
 
-    return GetRecipe.from_orm_with_meals(recipe)
+    etag = recipe_etag(recipe_id, validator)
+    if conditional.is_fresh(etag, last_modified):
+        return not_modified(etag, last_modified)
+
+    recipes = await recipe_rows(session, [recipe_id])
+
+    if not recipes:
+        raise HTTPException(status_code=404, detail="Recipe not found")
+
+    return FastJSONResponse(recipes[0], headers=cache_headers(etag, last_modified))
 
 
-# Fetch all recipes for a user
+# Fetch all recipes for a user (keyset paginated, most recently updated first)
 @router.get("/user/recipes", response_model=List[GetRecipe])
-async def get_all_recipes(session:Session = Depends(get_session), authorization: str = Header(...)):
+async def get_all_recipes(
+    session:AsyncSession = Depends(get_session),
+    authorization: str = Header(...),
+    limit: int = Query(PAGE_SIZE_DEFAULT, ge=1, le=PAGE_SIZE_MAX),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    conditional: ConditionalRequest = Depends(),
+):
 
     user_id = await verify_user(authorization)
 
-    recipes = session.exec(
-        select(RecipeModel)
-        .join(MealRecipeLink, MealRecipeLink.recipe_id == RecipeModel.id)
-        .join(MealModel, MealRecipeLink.meal_id == MealModel.id)
-        .where(MealModel.user_id == user_id).distinct(RecipeModel.id)
-    ).all()
-    
-    return [GetRecipe.from_orm_with_meals(recipe) for recipe in recipes]
+    projection = parse_fields(fields, GetRecipe.model_fields)
+
+    # meals count too: each recipe lists its meal ids
+    etag = weak_etag("recipes", user_id, limit, cursor, fields, await list_validator(session, user_id, RecipeModel, MealModel))
+    if conditional.is_fresh(etag):
+        return not_modified(etag)
+    names = [name for name in projection or GetRecipe.model_fields if name != "meals"]
+    columns = [RecipeModel.__table__.c[name] for name in dict.fromkeys(names + ["updated_at", "id"])]
+
+    query = (
+        select(*columns)
+        .where(RecipeModel.user_id == user_id)
+        .order_by(RecipeModel.updated_at.desc(), RecipeModel.id.desc())
+        .limit(limit + 1)
+    )
+    if cursor:
+        query = query.where(
+            keyset_after((RecipeModel.updated_at, RecipeModel.id), decode_cursor(cursor), descending=True)
+        )
+
+    rows = (await session.exec(query)).mappings().all()
+    page, next_cursor = paginate(rows, limit, ("updated_at", "id"))
+    headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else {}
+    headers.update(cache_headers(etag))
+
+    recipes = [dict(row) for row in page]
+    if projection is None or "meals" in projection:
+        await with_meal_ids(session, recipes)
+
+    # rows already match GetRecipe (or the projection), so skip response_model validation
+    names = projection or list(GetRecipe.model_fields)
+    return FastJSONResponse([{name: recipe[name] for name in names} for recipe in recipes], headers=headers)
+
+
+# Search a user's recipes by text, ingredient names and calories (ranked, keyset paginated)
+@router.get("/user/recipes/search", response_model=List[GetRecipeSearchResult])
+async def search_user_recipes(
+    session: AsyncSession = Depends(get_session),
+    authorization: str = Header(...),
+    q: Optional[str] = Query(None, max_length=200),
+    ingredient: List[str] = Query([]),
+    max_calories: Optional[float] = Query(None, ge=0),
+    limit: int = Query(PAGE_SIZE_DEFAULT, ge=1, le=PAGE_SIZE_MAX),
+    cursor: Optional[str] = None,
+    conditional: ConditionalRequest = Depends(),
+):
+
+    user_id = await verify_user(authorization)
+
+    q = q.strip() if q else None
+    if not q and not ingredient and max_calories is None:
+        raise HTTPException(status_code=400, detail="Give at least one of q, ingredient or max_calories")
+
+    etag = weak_etag("recipe-search", user_id, q, sorted(ingredient), max_calories, limit, cursor, await list_validator(session, user_id, RecipeModel, MealModel))
+    if conditional.is_fresh(etag):
+        return not_modified(etag)
+
+    after = decode_cursor(cursor, parse=float) if cursor else None
+    matches = await search_recipes(session, user_id, q, ingredient, max_calories, limit, after)
+    page, next_cursor = paginate(matches, limit, ("rank", "id"))
+    headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else {}
+    headers.update(cache_headers(etag))
+
+    recipes = {recipe["id"]: recipe for recipe in await recipe_rows(session, [match["id"] for match in page])}
+    return FastJSONResponse([{**recipes[match["id"]], "rank": match["rank"]} for match in page], headers=headers)
 
 
 # Fetch all recipes for a meal
 @router.get('/{meal_id}/recipes',response_model=List[GetRecipe])
-async def get_meal_recipes(meal_id: int, session: Session = Depends(get_session), authorization: str = Header(...)):
+async def get_meal_recipes(meal_id: int, session: AsyncSession = Depends(get_session), authorization: str = Header(...), conditional: ConditionalRequest = Depends()):
 
     user_id = await verify_user(authorization)
 
-    meal = session.get(MealModel, meal_id)
-    if not meal or meal.user_id != user_id:
+    validated = await meal_validator(session, user_id, meal_id)
+    if validated is None:
         raise HTTPException(status_code=404, detail="Meal not found or not yours")
 
-    return [GetRecipe.from_orm_with_meals(recipe) for recipe in meal.recipes]
+    validator, last_modified = validated
+    etag = weak_etag("meal-recipes", meal_id, validator)
+    if conditional.is_fresh(etag, last_modified):
+        return not_modified(etag, last_modified)
+
+    # meal_validator already checked ownership
+    recipes = await meal_recipe_rows(session, meal_id)
+    return FastJSONResponse(recipes, headers=cache_headers(etag, last_modified))
 
 
 # Update a recipe directly for a user (no meal_id required)
 @router.patch("/user/recipe/{recipe_id}", response_model=GetRecipe)
-async def update_user_recipe(recipe_id: int,data: UpdateRecipe,session: Session = Depends(get_session),authorization: str = Header(...)):
+async def update_user_recipe(recipe_id: int,data: UpdateRecipe,response: Response,session: AsyncSession = Depends(get_session),authorization: str = Header(...),if_match: Optional[str] = Header(None)):
     
    
     user_id = await verify_user(authorization)
-
-  
-    recipe = session.get(RecipeModel, recipe_id)
-    if not recipe:
-        raise HTTPException(status_code=404, detail="Recipe not found")
+    version = if_match_version(if_match)
 
     
-    if recipe.user_id != user_id:
-        raise HTTPException(status_code=403, detail="Not authorized to modify this recipe")
+    changes = data.model_dump(exclude_unset=True)
+    new_meal_ids = changes.pop("meal_ids", None)
 
-    
-    for field, value in data.model_dump(exclude_unset=True).items():
-        setattr(recipe, field, value)
+  
+    recipe = await update_returning(
+        session,
+        update(RecipeModel).where(RecipeModel.id == recipe_id, RecipeModel.user_id == user_id).values(**changes).returning(*RECIPE_COLUMNS),
+        RecipeModel,
+        version,
+    )
 
-   
-    recipe.updated_at = get_utc_now()
+    # the failure path alone reads the row, to tell the cases apart
+    if recipe is None:
+        owner_id = (await session.exec(select(RecipeModel.user_id).where(RecipeModel.id == recipe_id))).first()
+        if owner_id is None:
+            raise HTTPException(status_code=404, detail="Recipe not found")
+        if owner_id != user_id:
+            raise HTTPException(status_code=403, detail="Not authorized to modify this recipe")
+        raise HTTPException(status_code=412, detail="Recipe was modified since the If-Match version")
 
   
-    session.add(recipe)
-    session.commit()
-    session.refresh(recipe)
+    meal_ids = await apply_recipe_changes(session, user_id, recipe_id, changes, new_meal_ids)
+    # read inside the transaction, so the tag describes exactly the body returned (the validator
+    # itself doesn't depend on the meal passed)
+    validator, _, _ = await recipe_validator(session, user_id, 0, recipe_id)
+    await session.commit()
 
-    return GetRecipe.from_orm_with_meals(recipe)
+    response.headers["ETag"] = recipe_etag(recipe_id, validator)
+    return GetRecipe(**recipe, meals=meal_ids)
 
 
 #Update recipe for a meal belonging to a user
 @router.patch("/{meal_id}/recipe/{recipe_id}", response_model=GetRecipe)
-async def update_recipe(meal_id: int, recipe_id: int, data: UpdateRecipe, session: Session = Depends(get_session), authorization:str = Header(...)):
+async def update_recipe(meal_id: int, recipe_id: int, data: UpdateRecipe, response: Response, session: AsyncSession = Depends(get_session), authorization:str = Header(...), if_match: Optional[str] = Header(None)):
 
 
     user_id = await verify_user(authorization)
+    version = if_match_version(if_match)
 
+    changes = data.model_dump(exclude_unset=True)
+    new_meal_ids = changes.pop("meal_ids", None)
 
-    recipe = session.get(RecipeModel, recipe_id)
-    if not recipe:
-        raise HTTPException(status_code=404, detail="Recipe not found")
-    
-    if not any(meal.id == meal_id and meal.user_id == user_id for meal in recipe.meals):
-        raise HTTPException(status_code=404, detail="Recipe not linked to this meal or not yours")
+    # the recipe must be linked to this meal, and the meal must be the user's
+    linked = (
+        select(MealRecipeLink.meal_id)
+        .join(MealModel, MealModel.id == MealRecipeLink.meal_id)
+        .where(MealRecipeLink.recipe_id == RecipeModel.id, MealRecipeLink.meal_id == meal_id, MealModel.user_id == user_id)
+        .exists()
+    )
+    recipe = await update_returning(
+        session,
+        update(RecipeModel).where(RecipeModel.id == recipe_id, linked).values(**changes).returning(*RECIPE_COLUMNS),
+        RecipeModel,
+        version,
+    )
 
-    for field, value in data.model_dump(exclude_unset=True).items():
-        setattr(recipe, field, value)
+    if recipe is None:
+        found = (await session.exec(select(RecipeModel.id, linked).where(RecipeModel.id == recipe_id))).first()
+        if found is None:
+            raise HTTPException(status_code=404, detail="Recipe not found")
+        if not found[1] or version is None:
+            raise HTTPException(status_code=404, detail="Recipe not linked to this meal or not yours")
+        raise HTTPException(status_code=412, detail="Recipe was modified since the If-Match version")
 
-    recipe.updated_at = get_utc_now()
-    session.add(recipe)
-    session.commit()
-    session.refresh(recipe)
-    return GetRecipe.from_orm_with_meals(recipe)
+    meal_ids = await apply_recipe_changes(session, user_id, recipe_id, changes, new_meal_ids)
+    # read inside the transaction, so the tag describes exactly the body returned
+    validator, _, _ = await recipe_validator(session, user_id, meal_id, recipe_id)
+    await session.commit()
+
+    response.headers["ETag"] = recipe_etag(recipe_id, validator)
+    return GetRecipe(**recipe, meals=meal_ids)
 
 
 
 
 # Delete a recipe from user's library
 @router.delete("/user/recipe/{recipe_id}", status_code=204)
-async def delete_user_recipe(recipe_id: int,session: Session = Depends(get_session),authorization: str = Header(...),):
+async def delete_user_recipe(recipe_id: int,session: AsyncSession = Depends(get_session),authorization: str = Header(...),):
 
    
     user_id = await verify_user(authorization)
 
    
-    recipe = session.get(RecipeModel, recipe_id)
-    if not recipe:
+    owner_id = (await session.exec(select(RecipeModel.user_id).where(RecipeModel.id == recipe_id))).first()
+    if owner_id is None:
         raise HTTPException(status_code=404, detail="Recipe not found")
 
    
-    if recipe.user_id != user_id:
+    if owner_id != user_id:
         raise HTTPException(status_code=403, detail="Not authorized to delete this recipe")
 
 
-    links = session.exec(
-        select(MealRecipeLink).where(MealRecipeLink.recipe_id == recipe.id)
-    ).all()
-    for link in links:
-        session.delete(link)
+    meal_ids = (await session.exec(
+        delete(MealRecipeLink)
+        .where(MealRecipeLink.recipe_id == recipe_id)
+        .returning(MealRecipeLink.meal_id)
+        .execution_options(synchronize_session=False)
+    )).scalars().all()
 
    
-    session.delete(recipe)
-    session.commit()
+    await session.exec(delete(RecipeModel).where(RecipeModel.id == recipe_id).execution_options(synchronize_session=False))
+    await touch_meals(session, meal_ids)
+    await refresh_days(session, user_id, await meal_days(session, meal_ids))
+    await session.commit()
 
    
     return None
@@ -420,39 +771,27 @@ async def delete_user_recipe(recipe_id: int,session: Session = Depends(get_sessi
 
 # Delete recipe from a meal (and recipe entirely if no more links)
 @router.delete('/{meal_id}/recipe/{recipe_id}', status_code=204)
-async def delete_recipe(meal_id: int, recipe_id: int, session: Session = Depends(get_session), authorization: str = Header(...)):
+async def delete_recipe(meal_id: int, recipe_id: int, session: AsyncSession = Depends(get_session), authorization: str = Header(...)):
 
     user_id = await verify_user(authorization)
 
-   
-    recipe = session.get(RecipeModel, recipe_id)
-    if not recipe:
-        raise HTTPException(status_code=404, detail="Recipe not found")
-
-    # Check if the recipe is linked to the meal and owned by the user
-    link = session.exec(
-        select(MealRecipeLink)
-        .join(MealModel, MealRecipeLink.meal_id == MealModel.id)
-        .where(MealRecipeLink.recipe_id == recipe_id, MealRecipeLink.meal_id == meal_id, MealModel.user_id == user_id)
-    ).first()
-
-    if not link:
+    # Remove the link only if the meal belongs to the user
+    owned_meal = select(MealModel.id).where(MealModel.id == meal_id, MealModel.user_id == user_id)
+    unlinked = (await session.exec(
+        delete(MealRecipeLink)
+        .where(MealRecipeLink.meal_id == meal_id, MealRecipeLink.recipe_id == recipe_id, MealRecipeLink.meal_id.in_(owned_meal))
+        .returning(MealRecipeLink.recipe_id)
+        .execution_options(synchronize_session=False)
+    )).scalars().all()
+
+    if not unlinked:
+        if await session.get(RecipeModel, recipe_id) is None:
+            raise HTTPException(status_code=404, detail="Recipe not found")
         raise HTTPException(status_code=404, detail="Recipe not linked to this meal or not yours")
 
-   
-    session.delete(link)
-    session.commit() 
-
-    # Check if any remaining links exist for this recipe
-    remaining_links = session.exec(
-        select(MealRecipeLink).where(MealRecipeLink.recipe_id == recipe_id)
-    ).first()
-
-    if not remaining_links:
-        session.delete(recipe)
-        session.commit()  
+    await delete_orphaned_recipes(session, unlinked)
+    await touch_meals(session, [meal_id], unlinked)
+    await refresh_days(session, user_id, await meal_days(session, [meal_id]))
+    await session.commit()
 
     return None
-
-
-
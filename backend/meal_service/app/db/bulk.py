@@ -0,0 +1,173 @@
+"""
+Bulk import and streaming export of meal plans.
+"""
+import json
+from typing import AsyncIterator, Sequence
+from fastapi import HTTPException, Request
+from pydantic import ValidationError
+from fastapi.encoders import jsonable_encoder
+from sqlmodel import select, insert
+from sqlmodel.ext.asyncio.session import AsyncSession
+from .models import BulkMeal, BulkImportResult, MealModel, MealRecipeLink, RecipeModel, get_naive_utc_now, get_utc_now
+from .rollups import refresh_days
+from .queries import touch_meals
+from .session import async_session
+from ..helpers.config import BULK_BATCH_SIZE, BULK_MAX_MEALS
+
+
+def _batches(items: Sequence, size: int):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+async def _check_recipe_ownership(session: AsyncSession, user_id: int, meals: Sequence[BulkMeal]) -> None:
+    wanted = {recipe_id for meal in meals for recipe_id in meal.recipe_ids or ()}
+    if not wanted:
+        return
+
+    owned = set((await session.exec(
+        select(RecipeModel.id).where(RecipeModel.id.in_(wanted), RecipeModel.user_id == user_id)
+    )).all())
+
+    missing = sorted(wanted - owned)
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Recipes not found or not yours: {missing}")
+
+
+async def read_bulk_meals(request: Request) -> list[BulkMeal]:
+
+    """
+    Parses the request body as NDJSON (one meal per line) or as a JSON array of meals.
+    NDJSON is validated line by line as it streams in.
+    """
+    meals = []
+
+    def add(raw: bytes | str, where: str) -> None:
+        if len(meals) >= BULK_MAX_MEALS:
+            raise HTTPException(status_code=413, detail=f"At most {BULK_MAX_MEALS} meals per request")
+        try:
+            meals.append(BulkMeal.model_validate_json(raw) if isinstance(raw, (bytes, str)) else BulkMeal.model_validate(raw))
+        except ValidationError as exc:
+            raise HTTPException(status_code=422, detail={"at": where, "errors": exc.errors(include_url=False, include_input=False)})
+
+    content_type = request.headers.get("content-type", "")
+    if "ndjson" in content_type or "jsonl" in content_type:
+        buffer = b""
+        line_number = 0
+        async for chunk in request.stream():
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                line_number += 1
+                if line.strip():
+                    add(line, f"line {line_number}")
+        if buffer.strip():
+            add(buffer, f"line {line_number + 1}")
+        return meals
+
+    try:
+        body = json.loads(await request.body())
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Body must be a JSON array or NDJSON")
+    if not isinstance(body, list):
+        raise HTTPException(status_code=400, detail="Body must be a JSON array or NDJSON")
+
+    for index, item in enumerate(body):
+        add(item, f"item {index}")
+    return meals
+
+
+async def import_meals(session: AsyncSession, user_id: int, meals: Sequence[BulkMeal]) -> BulkImportResult:
+
+    """
+    Inserts meals, their new recipes and all links with batched multi-row INSERT ... RETURNING statements.
+    Does not commit; the caller owns the transaction.
+    """
+    await _check_recipe_ownership(session, user_id, meals)
+
+    now = get_utc_now()
+    meal_ids, recipe_ids, link_count, days = [], [], 0, set()
+
+    for batch in _batches(meals, BULK_BATCH_SIZE):
+        dates = [meal.date or get_naive_utc_now() for meal in batch]
+        days.update(meal_date.date() for meal_date in dates)
+
+        batch_meal_ids = (await session.exec(
+            insert(MealModel).returning(MealModel.id, sort_by_parameter_order=True),
+            params=[
+                {"user_id": user_id, "name": meal.name, "date": meal_date, "created_at": now, "updated_at": now}
+                for meal, meal_date in zip(batch, dates)
+            ],
+        )).scalars().all()
+        meal_ids += batch_meal_ids
+
+        new_recipes = [(meal_id, recipe) for meal_id, meal in zip(batch_meal_ids, batch) for recipe in meal.recipes or ()]
+        batch_recipe_ids = []
+        if new_recipes:
+            batch_recipe_ids = (await session.exec(
+                insert(RecipeModel).returning(RecipeModel.id, sort_by_parameter_order=True),
+                params=[
+                    {
+                        "user_id": user_id,
+                        "title": recipe.title,
+                        "ingredients": recipe.ingredients,
+                        "instructions": recipe.instructions,
+                        "calories": recipe.calories,
+                        "created_at": now,
+                        "updated_at": now,
+                    }
+                    for _, recipe in new_recipes
+                ],
+            )).scalars().all()
+            recipe_ids += batch_recipe_ids
+
+        links = {(meal_id, recipe_id) for (meal_id, _), recipe_id in zip(new_recipes, batch_recipe_ids)}
+        links |= {(meal_id, recipe_id) for meal_id, meal in zip(batch_meal_ids, batch) for recipe_id in meal.recipe_ids or ()}
+        if links:
+            await session.exec(
+                insert(MealRecipeLink),
+                params=[{"meal_id": meal_id, "recipe_id": recipe_id} for meal_id, recipe_id in sorted(links)],
+            )
+            link_count += len(links)
+
+    # existing recipes now list the new meals too
+    await touch_meals(session, recipe_ids={recipe_id for meal in meals for recipe_id in meal.recipe_ids or ()})
+    await refresh_days(session, user_id, days)
+    return BulkImportResult(meal_ids=meal_ids, recipe_ids=recipe_ids, link_count=link_count)
+
+
+async def export_meals(user_id: int) -> AsyncIterator[bytes]:
+
+    """
+    Yields the user's meals as NDJSON, one meal with its recipes per line, in (date, id) order.
+    Rows come from a server-side cursor, so memory use doesn't grow with the plan.
+    Uses its own session because the response is streamed after the request's dependencies have closed.
+    """
+    query = (
+        select(
+            MealModel.id, MealModel.name, MealModel.date, MealModel.created_at, MealModel.updated_at,
+            RecipeModel.id, RecipeModel.title, RecipeModel.ingredients, RecipeModel.instructions, RecipeModel.calories,
+        )
+        .select_from(MealModel)
+        .outerjoin(MealRecipeLink, MealRecipeLink.meal_id == MealModel.id)
+        .outerjoin(RecipeModel, MealRecipeLink.recipe_id == RecipeModel.id)
+        .where(MealModel.user_id == user_id)
+        .order_by(MealModel.date, MealModel.id, RecipeModel.id)
+        .execution_options(yield_per=BULK_BATCH_SIZE)
+    )
+
+    async with async_session() as session:
+        current = None
+        async for meal_id, name, meal_date, created_at, updated_at, recipe_id, title, ingredients, instructions, calories in await session.stream(query):
+            if current is None or current["id"] != meal_id:
+                if current is not None:
+                    yield (json.dumps(jsonable_encoder(current)) + "\n").encode()
+                current = {"id": meal_id, "name": name, "date": meal_date, "created_at": created_at, "updated_at": updated_at, "recipes": []}
+
+            if recipe_id is not None:
+                current["recipes"].append(
+                    {"id": recipe_id, "title": title, "ingredients": ingredients, "instructions": instructions, "calories": calories}
+                )
+
+        if current is not None:
+            yield (json.dumps(jsonable_encoder(current)) + "\n").encode()
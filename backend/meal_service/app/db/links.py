@@ -0,0 +1,119 @@
+"""
+Batched MealRecipeLink changes.
+
+Ownership is checked with one query per side, only links that actually change are inserted or
+deleted, and the affected meals are touched and their days' rollups refreshed. Nothing here commits.
+"""
+from datetime import datetime
+from typing import Iterable, Optional
+from fastapi import HTTPException
+from sqlalchemy import tuple_
+from sqlmodel import select, insert, delete
+from sqlmodel.ext.asyncio.session import AsyncSession
+from .models import MealModel, MealRecipeLink, RecipeModel, LinkBatch, LinkBatchResult
+from .queries import touch_meals
+from .rollups import refresh_days
+
+
+async def meal_dates(session: AsyncSession, user_id: int, meal_ids: Iterable[int]) -> dict[int, datetime]:
+
+    """
+    {meal_id: date} for those of `meal_ids` the user owns.
+    """
+    meal_ids = list(set(meal_ids))
+    if not meal_ids:
+        return {}
+
+    rows = await session.exec(select(MealModel.id, MealModel.date).where(MealModel.id.in_(meal_ids), MealModel.user_id == user_id))
+    return dict(rows.all())
+
+
+def _require(wanted: Iterable[int], owned: Iterable[int], label: str) -> None:
+    missing = sorted(set(wanted) - set(owned))
+    if missing:
+        raise HTTPException(status_code=404, detail=f"{label} not found or not yours: {missing}")
+
+
+async def _insert_links(session: AsyncSession, pairs: set[tuple[int, int]]) -> None:
+    if pairs:
+        await session.exec(insert(MealRecipeLink).values([{"meal_id": meal_id, "recipe_id": recipe_id} for meal_id, recipe_id in pairs]))
+
+
+async def _delete_links(session: AsyncSession, pairs: set[tuple[int, int]]) -> None:
+    if pairs:
+        await session.exec(
+            delete(MealRecipeLink)
+            .where(tuple_(MealRecipeLink.meal_id, MealRecipeLink.recipe_id).in_(list(pairs)))
+            .execution_options(synchronize_session=False)
+        )
+
+
+async def set_recipe_meals(
+    session: AsyncSession,
+    user_id: int,
+    recipe_id: int,
+    meal_ids: Iterable[int],
+    current: Optional[Iterable[int]] = None,
+    contents_changed: bool = False,
+) -> list[int]:
+
+    """
+    Links the recipe to exactly `meal_ids` and returns them sorted.
+    `current` is the recipe's linked meal ids when the caller already has them (empty for a new recipe).
+    With `contents_changed` (calories/ingredients edited) every linked day is refreshed, not just changed ones.
+    """
+    if current is None:
+        current = (await session.exec(select(MealRecipeLink.meal_id).where(MealRecipeLink.recipe_id == recipe_id))).all()
+    wanted, current = set(meal_ids), set(current)
+
+    dates = await meal_dates(session, user_id, wanted | current)
+    _require(wanted, dates, "Meals")
+
+    added, removed = wanted - current, current - wanted
+    await _insert_links(session, {(meal_id, recipe_id) for meal_id in added})
+    await _delete_links(session, {(meal_id, recipe_id) for meal_id in removed})
+
+    changed = wanted | current if contents_changed else added | removed
+    if added or removed:
+        await touch_meals(session, added | removed, [recipe_id])
+    await refresh_days(session, user_id, {dates[meal_id].date() for meal_id in changed if meal_id in dates})
+    return sorted(wanted)
+
+
+async def apply_links(session: AsyncSession, user_id: int, batch: LinkBatch) -> LinkBatchResult:
+
+    """
+    Adds `batch.link` and removes `batch.unlink`. Pairs already in the wanted state are skipped.
+    """
+    link = {(pair.meal_id, pair.recipe_id) for pair in batch.link}
+    unlink = {(pair.meal_id, pair.recipe_id) for pair in batch.unlink}
+    both = sorted(link & unlink)
+    if both:
+        raise HTTPException(status_code=400, detail=f"Pairs both linked and unlinked: {both}")
+
+    pairs = link | unlink
+    meal_ids = {meal_id for meal_id, _ in pairs}
+    recipe_ids = {recipe_id for _, recipe_id in pairs}
+
+    dates = await meal_dates(session, user_id, meal_ids)
+    _require(meal_ids, dates, "Meals")
+    owned_recipes = (await session.exec(
+        select(RecipeModel.id).where(RecipeModel.id.in_(recipe_ids), RecipeModel.user_id == user_id)
+    )).all()
+    _require(recipe_ids, owned_recipes, "Recipes")
+
+    # a superset of the pairs in question, narrowed in Python
+    existing = set((await session.exec(
+        select(MealRecipeLink.meal_id, MealRecipeLink.recipe_id)
+        .where(MealRecipeLink.meal_id.in_(meal_ids), MealRecipeLink.recipe_id.in_(recipe_ids))
+    )).all())
+
+    added, removed = link - existing, unlink & existing
+    await _insert_links(session, added)
+    await _delete_links(session, removed)
+
+    changed = added | removed
+    if changed:
+        await touch_meals(session, {meal_id for meal_id, _ in changed}, {recipe_id for _, recipe_id in changed})
+        await refresh_days(session, user_id, {dates[meal_id].date() for meal_id, _ in changed})
+    return LinkBatchResult(linked=len(added), unlinked=len(removed))
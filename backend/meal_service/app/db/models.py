@@ -1,12 +1,25 @@
-from sqlmodel import SQLModel,Field,Relationship,DateTime,Column,JSON
+from sqlmodel import SQLModel,Field,Relationship,DateTime,Column,JSON,Index,text
+from sqlalchemy.dialects.postgresql import JSONB
 from enum import Enum
+from pydantic import field_validator
 from typing import List, Optional
-from datetime import datetime,timezone
+from datetime import date,datetime,timezone
 
 
 def get_utc_now():
     return datetime.now(timezone.utc)
 
+
+def to_naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    # mealmodel.date is a plain TIMESTAMP column; asyncpg rejects tz-aware values for it
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def get_naive_utc_now():
+    return to_naive_utc(get_utc_now())
+
 #HELPERS
 
 class UnitEnum(str, Enum):
@@ -30,16 +43,19 @@ class Ingredient(SQLModel):
 
 class MealRecipeLink(SQLModel, table=True):
     meal_id: int = Field(foreign_key="mealmodel.id", primary_key=True)
-    recipe_id: int = Field(foreign_key="recipemodel.id", primary_key=True)
+    recipe_id: int = Field(foreign_key="recipemodel.id", primary_key=True, index=True)  # pk only covers meal_id lookups
 
 
 class MealModel(SQLModel, table = True):
 
+    # (user_id, date) serves both per-user listings and calendar ranges
+    __table_args__ = (Index("ix_mealmodel_user_id_date", "user_id", "date"),)
+
     id: Optional[int] = Field(default=None, primary_key=True)
     user_id: int
 
     name: str
-    date: datetime = Field(default_factory=get_utc_now)
+    date: datetime = Field(default_factory=get_naive_utc_now)
 
     created_at: datetime = Field(default_factory=get_utc_now, sa_type=DateTime(timezone=True))
     updated_at: datetime = Field(default_factory=get_utc_now, sa_type=DateTime(timezone=True))
@@ -47,12 +63,31 @@ class MealModel(SQLModel, table = True):
     recipes: List["RecipeModel"] = Relationship(back_populates="meals",link_model=MealRecipeLink)
 
 
+# Search expressions (PostgreSQL only); queries must spell them exactly like this to use the GIN indexes
+RECIPE_SEARCH_VECTOR = "to_tsvector('english', coalesce(title, '') || ' ' || coalesce(instructions, ''))"
+RECIPE_INGREDIENT_NAMES = "(lower(jsonb_path_query_array(ingredients, '$[*].name')::text)::jsonb)"
+
+
 class RecipeModel(SQLModel, table = True):
+
+    # (user_id, updated_at) serves per-user lookups and the recipe list's keyset order
+    __table_args__ = (
+        Index("ix_recipemodel_user_id_updated_at", "user_id", "updated_at"),
+        Index("ix_recipemodel_search", text(RECIPE_SEARCH_VECTOR), postgresql_using="gin").ddl_if(dialect="postgresql"),
+        Index("ix_recipemodel_ingredient_names", text(RECIPE_INGREDIENT_NAMES), postgresql_using="gin").ddl_if(dialect="postgresql"),
+        # containment queries (ingredients @> '[{"name": ..., "unit": ...}]')
+        Index(
+            "ix_recipemodel_ingredients", "ingredients",
+            postgresql_using="gin", postgresql_ops={"ingredients": "jsonb_path_ops"},
+        ).ddl_if(dialect="postgresql"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     user_id: int
 
     title: str
-    ingredients: Optional[list[Ingredient]] = Field(default=None, sa_column=Column(JSON))
+    # JSONB on PostgreSQL: stored parsed, so reads skip the text parse and GIN can index it
+    ingredients: Optional[list[Ingredient]] = Field(default=None, sa_column=Column(JSON().with_variant(JSONB(), "postgresql")))
     instructions: Optional[str] = None
     calories: Optional[float] = None
 
@@ -66,6 +101,24 @@ class RecipeModel(SQLModel, table = True):
 
 
 
+class DailyRollup(SQLModel, table=True):
+
+    """
+    Per-user, per-day totals over every recipe linked to that day's meals.
+    Maintained by db.rollups on each write; ingredient quantities are kept in base units (gm, ml, pcs).
+    """
+
+    user_id: int = Field(primary_key=True)
+    day: date = Field(primary_key=True)
+
+    meal_count: int = 0
+    recipe_count: int = 0
+    calories: float = 0
+    ingredients: Optional[list[Ingredient]] = Field(default=None, sa_column=Column(JSON))
+
+    updated_at: datetime = Field(default_factory=get_utc_now, sa_type=DateTime(timezone=True))
+
+
 ##SCHEMAS
 
 class CreateMeal(SQLModel):
@@ -74,6 +127,11 @@ class CreateMeal(SQLModel):
    
     name: str
     date: Optional[datetime] = None
+
+    @field_validator("date")
+    @classmethod
+    def naive_date(cls, value):
+        return to_naive_utc(value)
     
 
 
@@ -87,11 +145,50 @@ class CreateRecipe(SQLModel):
     meal_ids: Optional[List[int]] = None  # new field for linking to meals
 
 
+class BulkMeal(SQLModel):
+
+    name: str
+    date: Optional[datetime] = None
+    recipes: Optional[List[CreateRecipe]] = None  # new recipes, linked to this meal
+    recipe_ids: Optional[List[int]] = None  # existing recipes to link
+
+    @field_validator("date")
+    @classmethod
+    def naive_date(cls, value):
+        return to_naive_utc(value)
+
+
+class BulkImportResult(SQLModel):
+    meal_ids: List[int]
+    recipe_ids: List[int]
+    link_count: int
+
+
+class MealRecipePair(SQLModel):
+    meal_id: int
+    recipe_id: int
+
+
+class LinkBatch(SQLModel):
+    link: List[MealRecipePair] = []  # pairs already linked are skipped
+    unlink: List[MealRecipePair] = []  # pairs not linked are skipped
+
+
+class LinkBatchResult(SQLModel):
+    linked: int
+    unlinked: int
+
+
 class UpdateMeal(SQLModel):
 
     name: Optional[str]
     date: Optional[datetime] = None
 
+    @field_validator("date")
+    @classmethod
+    def naive_date(cls, value):
+        return to_naive_utc(value)
+
 
 class UpdateRecipe(SQLModel):
 
@@ -114,7 +211,8 @@ class GetRecipe(SQLModel):
     updated_at: datetime
 
     @classmethod
-    def from_orm_with_meals(cls, recipe:"RecipeModel"):
+    def from_orm_with_meals(cls, recipe:"RecipeModel", meal_ids: Optional[List[int]] = None):
+        # pass meal_ids (see db.queries.meal_ids_by_recipe) to avoid touching recipe.meals
         return cls(
             id = recipe.id,
             user_id = recipe.user_id,
@@ -122,12 +220,17 @@ class GetRecipe(SQLModel):
             ingredients = recipe.ingredients,
             instructions = recipe.instructions,
             calories = recipe.calories,
-            meals = [meal.id for meal in recipe.meals],
+            meals = meal_ids if meal_ids is not None else [meal.id for meal in recipe.meals],
             created_at=recipe.created_at,
             updated_at=recipe.updated_at,
         )
 
 
+class GetRecipeSearchResult(GetRecipe):
+
+    rank: float  # higher is better; 0 when searching without `q`
+
+
 class GetMealSummary(SQLModel):
     id: int
     user_id: int
@@ -161,4 +264,46 @@ class GetMeal(SQLModel):
         )
 
 
+class GroceryItem(SQLModel):
+    name: str
+    quantity: float
+    unit: UnitEnum
+
+
+class GroceryList(SQLModel):
+    start: date
+    end: date
+    meal_count: int
+    items: List[GroceryItem]
+
+
+class GetDailyRollup(SQLModel):
+    day: date
+    meal_count: int
+    recipe_count: int
+    calories: float
+
+
+class GetRecipeSummary(SQLModel):
+    id: int
+    title: str
+    calories: Optional[float] = None
+
+
+class GetCalendarMeal(SQLModel):
+    id: int
+    name: str
+    date: datetime
+    updated_at: datetime
+    recipes: List[GetRecipeSummary]
+
+
+class GetCalendarDay(SQLModel):
+    day: date
+    meals: List[GetCalendarMeal]
+
 
+class GetCalendar(SQLModel):
+    start: date
+    end: date
+    days: List[GetCalendarDay]  # only days that have meals
@@ -0,0 +1,192 @@
+from collections import defaultdict
+from typing import Iterable, Optional
+from datetime import datetime
+from sqlalchemy import func, or_, and_, case
+from sqlalchemy.orm import aliased
+from sqlmodel import select, delete, update
+from sqlmodel.ext.asyncio.session import AsyncSession
+from .models import MealRecipeLink, MealModel, RecipeModel, get_utc_now
+
+
+async def meal_ids_by_recipe(session: AsyncSession, recipe_ids: Iterable[int]) -> dict[int, list[int]]:
+
+    """
+    Meal ids linked to each recipe, read from MealRecipeLink in a single query.
+    Saves loading full MealModel rows just to list their ids.
+    """
+    recipe_ids = list(set(recipe_ids))
+    meal_ids = defaultdict(list)
+    if not recipe_ids:
+        return meal_ids
+
+    links = await session.exec(
+        select(MealRecipeLink.recipe_id, MealRecipeLink.meal_id)
+        .where(MealRecipeLink.recipe_id.in_(recipe_ids))
+        .order_by(MealRecipeLink.recipe_id, MealRecipeLink.meal_id)
+    )
+    for recipe_id, meal_id in links:
+        meal_ids[recipe_id].append(meal_id)
+
+    return meal_ids
+
+
+async def delete_orphaned_recipes(session: AsyncSession, recipe_ids: Iterable[int]) -> None:
+
+    """
+    Deletes those of the given recipes that no longer have any MealRecipeLink, in one statement.
+    """
+    recipe_ids = list(set(recipe_ids))
+    if not recipe_ids:
+        return
+
+    still_linked = select(MealRecipeLink.recipe_id).where(MealRecipeLink.recipe_id == RecipeModel.id).exists()
+    await session.exec(
+        delete(RecipeModel)
+        .where(RecipeModel.id.in_(recipe_ids), ~still_linked)
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def recipe_summaries_by_meal(session: AsyncSession, meal_ids: Iterable[int]) -> dict[int, list[dict]]:
+
+    """
+    Id, title and calories of the recipes linked to each meal, in a single query.
+    """
+    meal_ids = list(set(meal_ids))
+    recipes = defaultdict(list)
+    if not meal_ids:
+        return recipes
+
+    rows = await session.exec(
+        select(MealRecipeLink.meal_id, RecipeModel.id, RecipeModel.title, RecipeModel.calories)
+        .join(RecipeModel, RecipeModel.id == MealRecipeLink.recipe_id)
+        .where(MealRecipeLink.meal_id.in_(meal_ids))
+        .order_by(MealRecipeLink.meal_id, RecipeModel.id)
+    )
+    for meal_id, recipe_id, title, calories in rows:
+        recipes[meal_id].append({"id": recipe_id, "title": title, "calories": calories})
+
+    return recipes
+
+
+async def meal_range_validator(session: AsyncSession, user_id: int, start: datetime, end: datetime) -> tuple:
+
+    """
+    Cheap aggregate over the meals in [start, end) and their links and recipes.
+    Any write that changes what the calendar shows for that window changes one of these values
+    (link changes bump the meal's updated_at, see touch_meals).
+    """
+    row = (await session.exec(
+        select(
+            func.count(func.distinct(MealModel.id)),
+            func.max(MealModel.updated_at),
+            func.count(MealRecipeLink.recipe_id),
+            func.max(RecipeModel.updated_at),
+        )
+        .select_from(MealModel)
+        .outerjoin(MealRecipeLink, MealRecipeLink.meal_id == MealModel.id)
+        .outerjoin(RecipeModel, RecipeModel.id == MealRecipeLink.recipe_id)
+        .where(MealModel.user_id == user_id, MealModel.date >= start, MealModel.date < end)
+    )).one()
+    return tuple(row)
+
+
+async def touch_meals(session: AsyncSession, meal_ids: Iterable[int] = (), recipe_ids: Iterable[int] = ()) -> None:
+
+    """
+    Bumps updated_at on the given meals and on every meal still linked to the given recipes, in one statement.
+    Called whenever links change, since GetMeal/GetRecipe payloads include the links on both sides,
+    so validators built from max(updated_at) notice the change.
+    """
+    meal_ids, recipe_ids = list(set(meal_ids)), list(set(recipe_ids))
+    conditions = []
+    if meal_ids:
+        conditions.append(MealModel.id.in_(meal_ids))
+    if recipe_ids:
+        conditions.append(MealModel.id.in_(
+            select(MealRecipeLink.meal_id).where(MealRecipeLink.recipe_id.in_(recipe_ids))
+        ))
+    if not conditions:
+        return
+
+    await session.exec(
+        update(MealModel)
+        .where(or_(*conditions))
+        .values(updated_at=get_utc_now())
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _latest(*moments: Optional[datetime]) -> Optional[datetime]:
+    moments = [moment for moment in moments if moment is not None]
+    return max(moments) if moments else None
+
+
+async def meal_validator(session: AsyncSession, user_id: int, meal_id: int) -> Optional[tuple[tuple, Optional[datetime]]]:
+
+    """
+    (validator, last_modified) for a meal and its recipes, from one aggregate query, or None if the meal
+    isn't the user's. Covers the meal row, its recipes, and the other meals those recipes list.
+    """
+    other_link = aliased(MealRecipeLink)
+    other_meal = aliased(MealModel)
+
+    row = (await session.exec(
+        select(
+            MealModel.updated_at,
+            func.count(func.distinct(MealRecipeLink.recipe_id)),
+            func.max(RecipeModel.updated_at),
+            func.count(other_link.meal_id),
+            func.max(other_meal.updated_at),
+        )
+        .select_from(MealModel)
+        .outerjoin(MealRecipeLink, MealRecipeLink.meal_id == MealModel.id)
+        .outerjoin(RecipeModel, RecipeModel.id == MealRecipeLink.recipe_id)
+        .outerjoin(other_link, other_link.recipe_id == RecipeModel.id)
+        .outerjoin(other_meal, other_meal.id == other_link.meal_id)
+        .where(MealModel.id == meal_id, MealModel.user_id == user_id)
+        .group_by(MealModel.id, MealModel.updated_at)
+    )).first()
+
+    if row is None:
+        return None
+    return tuple(row), _latest(row[0], row[2], row[4])
+
+
+async def recipe_validator(session: AsyncSession, user_id: int, meal_id: int, recipe_id: int) -> Optional[tuple[tuple, Optional[datetime], bool]]:
+
+    """
+    (validator, last_modified, linked) for a recipe and the meals it lists, or None if it doesn't exist.
+    `linked` says whether it is linked to meal_id and that meal is the user's.
+    """
+    row = (await session.exec(
+        select(
+            RecipeModel.updated_at,
+            func.count(MealRecipeLink.meal_id),
+            func.max(MealModel.updated_at),
+            func.sum(case((and_(MealModel.id == meal_id, MealModel.user_id == user_id), 1), else_=0)),
+        )
+        .select_from(RecipeModel)
+        .outerjoin(MealRecipeLink, MealRecipeLink.recipe_id == RecipeModel.id)
+        .outerjoin(MealModel, MealModel.id == MealRecipeLink.meal_id)
+        .where(RecipeModel.id == recipe_id)
+        .group_by(RecipeModel.id, RecipeModel.updated_at)
+    )).first()
+
+    if row is None:
+        return None
+    return tuple(row[:3]), _latest(row[0], row[2]), bool(row[3])
+
+
+async def list_validator(session: AsyncSession, user_id: int, *models) -> tuple:
+
+    """
+    Count and max(updated_at) of the user's rows in each of `models` (MealModel/RecipeModel), in one query
+    over the user_id indexes. Enough for the list endpoints: link changes bump meal updated_at
+    and deletes change a count.
+    """
+    columns = []
+    for model in models:
+        columns.append(select(func.count(model.id)).where(model.user_id == user_id).scalar_subquery())
+        columns.append(select(func.max(model.updated_at)).where(model.user_id == user_id).scalar_subquery())
+    return tuple((await session.exec(select(*columns))).one())
@@ -0,0 +1,231 @@
+"""
+Daily rollups: per-user, per-day calorie and ingredient totals (see models.DailyRollup).
+
+Write paths call `refresh_days` with the days they touched, inside their own transaction,
+so the rollup never disagrees with the committed meals and recipes.
+
+    python -m app.db.rollups rebuild    recompute every rollup from scratch
+    python -m app.db.rollups verify     compare stored rollups with live data
+"""
+import asyncio
+import math
+import sys
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from typing import Iterable, Optional
+from sqlalchemy import func, or_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlmodel import select, delete
+from sqlmodel.ext.asyncio.session import AsyncSession
+from .models import DailyRollup, MealModel, MealRecipeLink, RecipeModel
+from .session import async_session, engine
+from ..helpers.grocery import GroceryAggregator
+
+# first key of the per-user advisory lock taken by refresh_days on PostgreSQL, the user id is the second
+ROLLUP_LOCK_NAMESPACE = 0x526F6C6C  # "Roll"
+
+# day ranges OR-ed into one compute query; SQLite rejects expressions nested 1000 deep
+DAY_RANGES_PER_QUERY = 200
+
+# rows per upsert statement, 7 parameters each stays under SQLite's and asyncpg's bind limits
+UPSERT_BATCH_SIZE = 1000
+
+
+class _DayTotals:
+
+    def __init__(self):
+        self.meal_ids = set()
+        self.recipe_count = 0
+        self.calories = 0.0
+        self.ingredients = GroceryAggregator()
+
+    def as_rollup(self, user_id: int, day: date) -> DailyRollup:
+        return DailyRollup(
+            user_id=user_id,
+            day=day,
+            meal_count=len(self.meal_ids),
+            recipe_count=self.recipe_count,
+            calories=self.calories,
+            ingredients=self.ingredients.items(display=False),
+        )
+
+
+def day_range(day: date) -> tuple[datetime, datetime]:
+    # mealmodel.date is naive UTC
+    start = datetime.combine(day, time.min)
+    return start, start + timedelta(days=1)
+
+
+def day_ranges(days: Iterable[date]) -> list[tuple[datetime, datetime]]:
+    # consecutive days merged into one half-open range
+    ranges: list[tuple[datetime, datetime]] = []
+    for day in sorted(days):
+        start, end = day_range(day)
+        if ranges and ranges[-1][1] == start:
+            ranges[-1] = (ranges[-1][0], end)
+        else:
+            ranges.append((start, end))
+    return ranges
+
+
+async def compute_rollups(
+    session: AsyncSession,
+    user_id: Optional[int] = None,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    ranges: Optional[list[tuple[datetime, datetime]]] = None,
+) -> dict[tuple[int, date], DailyRollup]:
+
+    """
+    Rollups computed from live data in one streamed pass, optionally limited to a user,
+    an inclusive day range and/or the given datetime ranges (see day_ranges).
+    """
+    query = (
+        select(MealModel.user_id, MealModel.id, MealModel.date, RecipeModel.id, RecipeModel.calories, RecipeModel.ingredients)
+        .select_from(MealModel)
+        .outerjoin(MealRecipeLink, MealRecipeLink.meal_id == MealModel.id)
+        .outerjoin(RecipeModel, MealRecipeLink.recipe_id == RecipeModel.id)
+    )
+    if user_id is not None:
+        query = query.where(MealModel.user_id == user_id)
+    if start is not None:
+        query = query.where(MealModel.date >= day_range(start)[0])
+    if end is not None:
+        query = query.where(MealModel.date < day_range(end)[1])
+    if ranges is not None:
+        # ranges rather than date(MealModel.date) keep the date index usable
+        query = query.where(or_(*((MealModel.date >= range_start) & (MealModel.date < range_end) for range_start, range_end in ranges)))
+
+    totals: dict[tuple[int, date], _DayTotals] = defaultdict(_DayTotals)
+    async for owner_id, meal_id, meal_date, recipe_id, calories, ingredients in await session.stream(query):
+        day_totals = totals[owner_id, meal_date.date()]
+        day_totals.meal_ids.add(meal_id)
+        if recipe_id is not None:
+            day_totals.recipe_count += 1
+            day_totals.calories += calories or 0
+            day_totals.ingredients.add(ingredients)
+
+    return {key: day_totals.as_rollup(*key) for key, day_totals in totals.items()}
+
+
+def _upsert(dialect_name: str, rollups: list[DailyRollup]):
+    insert = postgresql.insert if dialect_name == "postgresql" else sqlite.insert
+    statement = insert(DailyRollup).values([
+        {
+            "user_id": rollup.user_id,
+            "day": rollup.day,
+            "meal_count": rollup.meal_count,
+            "recipe_count": rollup.recipe_count,
+            "calories": rollup.calories,
+            "ingredients": rollup.ingredients,
+            "updated_at": rollup.updated_at,
+        }
+        for rollup in rollups
+    ])
+    return statement.on_conflict_do_update(
+        index_elements=[DailyRollup.user_id, DailyRollup.day],
+        set_={
+            column: statement.excluded[column]
+            for column in ("meal_count", "recipe_count", "calories", "ingredients", "updated_at")
+        },
+    )
+
+
+async def refresh_days(session: AsyncSession, user_id: int, days: Iterable[date]) -> None:
+
+    """
+    Recomputes the given days for one user. Does not commit.
+    Recomputes for the same user are serialized until the transaction ends (an advisory
+    lock on PostgreSQL, SQLite only has one writer anyway), so two concurrent writes can't
+    leave a day computed from a snapshot that misses the other's rows.
+    """
+    days = set(days)
+    if not days:
+        return
+
+    dialect_name = session.bind.dialect.name
+    if dialect_name == "postgresql":
+        await session.exec(select(func.pg_advisory_xact_lock(ROLLUP_LOCK_NAMESPACE, user_id)))
+
+    ranges = day_ranges(days)
+    computed: dict[tuple[int, date], DailyRollup] = {}
+    for start in range(0, len(ranges), DAY_RANGES_PER_QUERY):
+        computed.update(await compute_rollups(session, user_id, ranges=ranges[start:start + DAY_RANGES_PER_QUERY]))
+
+    rollups = list(computed.values())
+    for start in range(0, len(rollups), UPSERT_BATCH_SIZE):
+        await session.exec(_upsert(dialect_name, rollups[start:start + UPSERT_BATCH_SIZE]))
+    emptied = days - {day for _, day in computed}
+    if emptied:
+        await session.exec(delete(DailyRollup).where(DailyRollup.user_id == user_id, DailyRollup.day.in_(emptied)))
+
+
+async def meal_days(session: AsyncSession, meal_ids: Iterable[int]) -> set[date]:
+    meal_ids = list(meal_ids)
+    if not meal_ids:
+        return set()
+
+    dates = await session.exec(select(MealModel.date).where(MealModel.id.in_(meal_ids)))
+    return {meal_date.date() for meal_date in dates}
+
+
+async def rebuild(session: AsyncSession) -> int:
+    computed = await compute_rollups(session)
+
+    await session.exec(delete(DailyRollup))
+    session.add_all(computed.values())
+    await session.commit()
+    return len(computed)
+
+
+def _same(stored: DailyRollup, live: DailyRollup) -> bool:
+    if (stored.meal_count, stored.recipe_count) != (live.meal_count, live.recipe_count):
+        return False
+    if not math.isclose(stored.calories, live.calories, abs_tol=1e-6):
+        return False
+
+    def quantities(rollup):
+        return {(item["name"], item["unit"]): item["quantity"] for item in rollup.ingredients or []}
+
+    stored_quantities, live_quantities = quantities(stored), quantities(live)
+    return stored_quantities.keys() == live_quantities.keys() and all(
+        math.isclose(stored_quantities[key], live_quantities[key], rel_tol=1e-9, abs_tol=1e-9) for key in live_quantities
+    )
+
+
+async def verify(session: AsyncSession) -> list[tuple[int, date]]:
+
+    """
+    (user_id, day) keys whose stored rollup is missing, stale or orphaned.
+    """
+    live = await compute_rollups(session)
+    stored = {(rollup.user_id, rollup.day): rollup for rollup in (await session.exec(select(DailyRollup))).all()}
+
+    mismatched = [key for key in live if key not in stored or not _same(stored[key], live[key])]
+    mismatched += [key for key in stored if key not in live]
+    return sorted(mismatched)
+
+
+async def main(command: str) -> int:
+    try:
+        async with async_session() as session:
+            if command == "rebuild":
+                count = await rebuild(session)
+                print(f"Rebuilt {count} daily rollups")
+                mismatched = await verify(session)
+            elif command == "verify":
+                mismatched = await verify(session)
+            else:
+                print(__doc__)
+                return 2
+    finally:
+        await engine.dispose()
+
+    for user_id, day in mismatched:
+        print(f"mismatch: user {user_id} on {day}")
+    print("Rollups match live data" if not mismatched else f"{len(mismatched)} rollups differ from live data")
+    return 1 if mismatched else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(sys.argv[1] if len(sys.argv) > 1 else "")))
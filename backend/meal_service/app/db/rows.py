@@ -0,0 +1,73 @@
+"""
+Read paths that map result rows straight into response dicts.
+
+GetMeal/GetRecipe are only the documented response shapes here: the rows already hold
+validated data (ingredients were checked on write), so they are neither built as pydantic
+objects nor re-validated, and go to ORJSONResponse as plain dicts and lists.
+"""
+from typing import Iterable, Optional
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from .models import MealModel, MealRecipeLink, RecipeModel, GetMeal, GetRecipe
+from .queries import meal_ids_by_recipe
+
+
+MEAL_COLUMNS = [MealModel.__table__.c[name] for name in GetMeal.model_fields if name != "recipes"]
+RECIPE_COLUMNS = [RecipeModel.__table__.c[name] for name in GetRecipe.model_fields if name != "meals"]
+RECIPE_FIELDS = list(GetRecipe.model_fields)
+
+
+async def with_meal_ids(session: AsyncSession, recipes: list[dict]) -> list[dict]:
+
+    """
+    Adds the `meals` list to recipe dicts with one query over MealRecipeLink.
+    """
+    meal_ids = await meal_ids_by_recipe(session, [recipe["id"] for recipe in recipes])
+    for recipe in recipes:
+        recipe["meals"] = meal_ids.get(recipe["id"], [])
+    return recipes
+
+
+def _recipe_dicts(recipes: list[dict]) -> list[dict]:
+    # same key order as GetRecipe, so bodies match what response_model produced
+    return [{name: recipe[name] for name in RECIPE_FIELDS} for recipe in recipes]
+
+
+async def meal_recipe_rows(session: AsyncSession, meal_id: int) -> list[dict]:
+
+    rows = await session.exec(
+        select(*RECIPE_COLUMNS)
+        .join(MealRecipeLink, MealRecipeLink.recipe_id == RecipeModel.id)
+        .where(MealRecipeLink.meal_id == meal_id)
+        .order_by(RecipeModel.id)
+    )
+    return _recipe_dicts(await with_meal_ids(session, [dict(row) for row in rows.mappings()]))
+
+
+async def meal_row(session: AsyncSession, user_id: int, meal_id: int) -> Optional[dict]:
+
+    """
+    A GetMeal-shaped dict for the user's meal, recipes included, or None.
+    """
+    row = (await session.exec(
+        select(*MEAL_COLUMNS).where(MealModel.id == meal_id, MealModel.user_id == user_id)
+    )).mappings().first()
+
+    if row is None:
+        return None
+    return {**row, "recipes": await meal_recipe_rows(session, meal_id)}
+
+
+async def recipe_rows(session: AsyncSession, recipe_ids: Iterable[int]) -> list[dict]:
+
+    """
+    GetRecipe-shaped dicts for the given recipes, in id order.
+    """
+    recipe_ids = list(set(recipe_ids))
+    if not recipe_ids:
+        return []
+
+    rows = await session.exec(
+        select(*RECIPE_COLUMNS).where(RecipeModel.id.in_(recipe_ids)).order_by(RecipeModel.id)
+    )
+    return _recipe_dicts(await with_meal_ids(session, [dict(row) for row in rows.mappings()]))
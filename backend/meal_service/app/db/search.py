@@ -0,0 +1,165 @@
+"""
+Recipe search: full text over title + instructions, ingredient names and a calorie cap.
+
+On PostgreSQL this is one query over the expression GIN indexes on recipemodel
+(RECIPE_SEARCH_VECTOR / RECIPE_INGREDIENT_NAMES, migration 0005), ranked by ts_rank_cd.
+Other databases (SQLite in tests) get RecipeIndex, an inverted index built in Python over
+the user's recipes. Its tokenizer is simpler than Postgres' english config (no stemming or
+stop words) but it takes the same filters and returns the same (rank, id) ordering.
+"""
+import re
+from collections import Counter, defaultdict
+from typing import Any, Optional, Sequence
+from sqlalchemy import Float, cast, func, literal, literal_column
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from .models import RecipeModel, RECIPE_SEARCH_VECTOR, RECIPE_INGREDIENT_NAMES
+from ..helpers.pagination import keyset_after
+
+
+TOKEN = re.compile(r"\w+")
+
+
+def tokenize(text: Optional[str]) -> list[str]:
+    return [token.lower() for token in TOKEN.findall(text or "")]
+
+
+def parse_query(q: str) -> tuple[list[str], list[str]]:
+
+    """
+    Splits `q` into required and excluded (`-word`) terms, like websearch_to_tsquery does
+    for plain words.
+    """
+    required, excluded = [], []
+    for word in q.split():
+        if word.startswith("-"):
+            excluded.extend(tokenize(word[1:]))
+        else:
+            required.extend(tokenize(word))
+    return required, excluded
+
+
+class RecipeIndex:
+
+    """
+    Inverted index over a set of recipes:
+    term -> {recipe_id: occurrences} and ingredient name -> recipe ids.
+    """
+
+    def __init__(self):
+        self.terms: dict[str, Counter] = defaultdict(Counter)
+        self.ingredients: dict[str, set[int]] = defaultdict(set)
+        self.calories: dict[int, Optional[float]] = {}
+
+    def add(self, recipe_id: int, title: str, instructions: Optional[str], ingredients: Optional[list], calories: Optional[float]) -> None:
+        for token in tokenize(title) + tokenize(instructions):
+            self.terms[token][recipe_id] += 1
+        for ingredient in ingredients or ():
+            self.ingredients[ingredient["name"].lower()].add(recipe_id)
+        self.calories[recipe_id] = calories
+
+    def search(self, q: Optional[str], ingredients: Sequence[str], max_calories: Optional[float]) -> list[tuple[float, int]]:
+
+        """
+        (rank, recipe_id) of every match, best first. Rank is the number of query term
+        occurrences, 0 without `q`.
+        """
+        candidates = set(self.calories)
+        ranks = Counter()
+
+        if q:
+            required, excluded = parse_query(q)
+            if not required:
+                return []
+            for term in required:
+                postings = self.terms.get(term, {})
+                candidates &= postings.keys()
+                ranks.update({recipe_id: postings[recipe_id] for recipe_id in candidates})
+            for term in excluded:
+                candidates -= self.terms.get(term, {}).keys()
+
+        for name in ingredients:
+            candidates &= self.ingredients.get(name.lower(), set())
+
+        if max_calories is not None:
+            candidates = {
+                recipe_id for recipe_id in candidates
+                if self.calories[recipe_id] is not None and self.calories[recipe_id] <= max_calories
+            }
+
+        return sorted(((float(ranks[recipe_id]), recipe_id) for recipe_id in candidates), reverse=True)
+
+
+async def _search_postgres(
+    session: AsyncSession,
+    user_id: int,
+    q: Optional[str],
+    ingredients: Sequence[str],
+    max_calories: Optional[float],
+    limit: int,
+    after: Optional[tuple[float, int]],
+) -> list[Any]:
+
+    vector = literal_column(RECIPE_SEARCH_VECTOR)
+    if q:
+        tsquery = func.websearch_to_tsquery(literal_column("'english'"), q)
+        rank = cast(func.ts_rank_cd(vector, tsquery), Float)
+    else:
+        rank = literal(0.0, Float)
+
+    query = select(RecipeModel.id, rank.label("rank")).where(RecipeModel.user_id == user_id)
+    if q:
+        query = query.where(vector.op("@@")(tsquery))
+    if ingredients:
+        names = literal(sorted({name.lower() for name in ingredients}), JSONB)
+        query = query.where(literal_column(RECIPE_INGREDIENT_NAMES).op("@>")(names))
+    if max_calories is not None:
+        query = query.where(RecipeModel.calories <= max_calories)
+    if after:
+        query = query.where(keyset_after((rank, RecipeModel.id), after, descending=True))
+
+    query = query.order_by(rank.desc(), RecipeModel.id.desc()).limit(limit + 1)
+    return (await session.exec(query)).mappings().all()
+
+
+async def _search_in_python(
+    session: AsyncSession,
+    user_id: int,
+    q: Optional[str],
+    ingredients: Sequence[str],
+    max_calories: Optional[float],
+    limit: int,
+    after: Optional[tuple[float, int]],
+) -> list[dict]:
+
+    index = RecipeIndex()
+    rows = await session.exec(
+        select(RecipeModel.id, RecipeModel.title, RecipeModel.instructions, RecipeModel.ingredients, RecipeModel.calories)
+        .where(RecipeModel.user_id == user_id)
+    )
+    for row in rows:
+        index.add(*row)
+
+    matches = index.search(q, ingredients, max_calories)
+    if after:
+        matches = [match for match in matches if match < after]
+    return [{"id": recipe_id, "rank": rank} for rank, recipe_id in matches[:limit + 1]]
+
+
+async def search_recipes(
+    session: AsyncSession,
+    user_id: int,
+    q: Optional[str] = None,
+    ingredients: Sequence[str] = (),
+    max_calories: Optional[float] = None,
+    limit: int = 100,
+    after: Optional[tuple[float, int]] = None,
+) -> list[Any]:
+
+    """
+    Up to limit + 1 {"id", "rank"} rows for the user's recipes matching every given filter,
+    ordered by (rank, id) descending and continuing after the `after` key.
+    """
+    search = _search_postgres if session.bind.dialect.name == "postgresql" else _search_in_python
+    return await search(session, user_id, q, ingredients, max_calories, limit, after)
@@ -1,22 +1,72 @@
-import sqlmodel
-from sqlmodel import SQLModel,Field,ForeignKey,Session
-from app.helpers.config import DATABASE_URL
+import json
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.pool import StaticPool
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.helpers.config import DATABASE_URL, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_PRE_PING, DB_POOL_RECYCLE_SECONDS, DB_ECHO
 
 
 if DATABASE_URL == '':
     raise NotImplementedError("Database URL needs to be set")
-    
 
-engine = sqlmodel.create_engine(DATABASE_URL)
 
-def init_db():
+ASYNC_DRIVERS = {
+    "postgresql+psycopg2://": "postgresql+asyncpg://",
+    "postgresql://": "postgresql+asyncpg://",
+    "postgres://": "postgresql+asyncpg://",
+    "sqlite://": "sqlite+aiosqlite://",
+}
 
-    print("Creating Database")
-    SQLModel.metadata.create_all(engine)
 
+def async_database_url(url: str) -> str:
+    # plain URLs from .env are mapped onto their async drivers
+    for prefix, async_prefix in ASYNC_DRIVERS.items():
+        if url.startswith(prefix):
+            return async_prefix + url[len(prefix):]
+    return url
 
-def get_session():
 
-    with Session(engine) as session:
+def engine_options(url: str) -> dict:
+    if url.startswith("sqlite"):
+        if url.endswith(":memory:") or url.endswith("://"):
+            # a single shared connection, otherwise every session gets its own empty database
+            return {"poolclass": StaticPool, "connect_args": {"check_same_thread": False}}
+        return {}
+
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+        "pool_recycle": DB_POOL_RECYCLE_SECONDS,
+    }
+
+
+def json_serializer(value) -> str:
+    # JSON columns hold lists of Ingredient models
+    return json.dumps(jsonable_encoder(value))
+
+
+ASYNC_DATABASE_URL = async_database_url(DATABASE_URL)
+
+engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    echo=DB_ECHO,
+    json_serializer=json_serializer,
+    **engine_options(ASYNC_DATABASE_URL),
+)
+
+async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+
+async def init_db():
+
+    # only for throwaway databases (tests, local sqlite); real ones are managed by Alembic
+    print('Creating Database')
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+
+async def get_session():
+
+    async with async_session() as session:
         yield session
-    
\ No newline at end of file
@@ -0,0 +1,134 @@
+import asyncio
+import hashlib
+import time
+import httpx
+from fastapi import HTTPException, status
+from typing import Optional
+from .config import (
+    AUTH_SERVICE_URL,
+    AUTH_HTTP2,
+    AUTH_MAX_CONNECTIONS,
+    AUTH_MAX_KEEPALIVE_CONNECTIONS,
+    AUTH_KEEPALIVE_EXPIRY_SECONDS,
+    AUTH_TIMEOUT_SECONDS,
+    AUTH_CONNECT_TIMEOUT_SECONDS,
+)
+from .metrics import AUTH_UPSTREAM_LATENCY
+
+
+class AuthClient:
+
+    """
+    Long-lived httpx client for the auth service.
+    Concurrent lookups of the same token share a single upstream /me request.
+    """
+
+    def __init__(self):
+        self._client: Optional[httpx.AsyncClient] = None
+        self._inflight: dict[bytes, asyncio.Task] = {}
+
+        self.upstream_requests = 0
+        self.pool_hits = 0
+        self.pool_misses = 0
+        self.coalesced_waits = 0
+
+    def _build_client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            base_url=AUTH_SERVICE_URL,
+            http2=AUTH_HTTP2,
+            limits=httpx.Limits(
+                max_connections=AUTH_MAX_CONNECTIONS,
+                max_keepalive_connections=AUTH_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=AUTH_KEEPALIVE_EXPIRY_SECONDS,
+            ),
+            timeout=httpx.Timeout(AUTH_TIMEOUT_SECONDS, connect=AUTH_CONNECT_TIMEOUT_SECONDS),
+        )
+
+    async def start(self) -> None:
+        if self._client is None:
+            self._client = self._build_client()
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def stats(self) -> dict:
+        return {
+            "upstream_requests": self.upstream_requests,
+            "pool_hits": self.pool_hits,
+            "pool_misses": self.pool_misses,
+            "coalesced_waits": self.coalesced_waits,
+            "inflight": len(self._inflight),
+        }
+
+    async def fetch_user_id(self, token: str) -> int:
+        key = hashlib.sha256(token.encode()).digest()
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced_waits += 1
+        else:
+            task = asyncio.ensure_future(self._fetch_user_id(token))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+
+        # shield so one cancelled caller doesn't cancel the request for everyone else
+        return await asyncio.shield(task)
+
+    async def _fetch_user_id(self, token: str) -> int:
+        if self._client is None:
+            await self.start()
+
+        new_connection = False
+
+        async def trace(event_name, info):
+            nonlocal new_connection
+            if event_name == "connection.connect_tcp.started":
+                new_connection = True
+
+        self.upstream_requests += 1
+        outcome = "error"
+        started = time.perf_counter()
+        try:
+            resp = await self._client.get(
+                "/me",
+                headers={"Authorization": f"Bearer {token}"},
+                extensions={"trace": trace},
+            )
+            outcome = str(resp.status_code)
+        except httpx.HTTPError:
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Auth service unavailable")
+        finally:
+            AUTH_UPSTREAM_LATENCY.labels("me", outcome).observe(time.perf_counter() - started)
+            if new_connection:
+                self.pool_misses += 1
+            else:
+                self.pool_hits += 1
+
+        if resp.status_code != 200:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid or expired token")
+
+        user_id = resp.json().get("id")
+
+        if user_id is None:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token payload")
+
+        return int(user_id)  # ensure user_id is an int
+
+    async def fetch_revocations(self, after: int) -> dict:
+        if self._client is None:
+            await self.start()
+
+        outcome = "error"
+        started = time.perf_counter()
+        try:
+            resp = await self._client.get("/revocations", params={"after": after})
+            outcome = str(resp.status_code)
+        finally:
+            AUTH_UPSTREAM_LATENCY.labels("revocations", outcome).observe(time.perf_counter() - started)
+        resp.raise_for_status()
+        return resp.json()
+
+
+auth_client = AuthClient()
@@ -0,0 +1,114 @@
+import hashlib
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Optional
+from fastapi import Header, HTTPException, Response
+
+
+def weak_etag(*parts: Any) -> str:
+    # weak: the same validator means an equivalent payload, not byte-identical JSON
+    digest = hashlib.sha1(repr(parts).encode()).hexdigest()
+    return f'W/"{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+
+    """
+    Weak comparison of an If-None-Match header against the current ETag.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+
+    opaque = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == opaque for candidate in if_none_match.split(","))
+
+
+def _as_utc(moment: datetime) -> datetime:
+    # SQLite hands back naive values for timezone-aware columns; they are UTC
+    if moment.tzinfo is None:
+        return moment.replace(tzinfo=timezone.utc)
+    return moment.astimezone(timezone.utc)
+
+
+def http_date(moment: datetime) -> str:
+    return format_datetime(_as_utc(moment), usegmt=True)
+
+
+def not_modified_since(if_modified_since: Optional[str], last_modified: Optional[datetime]) -> bool:
+    if not if_modified_since or last_modified is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        return False
+
+    last_modified = _as_utc(last_modified)
+    # HTTP dates have whole seconds; a change later in the same second would look unmodified
+    if datetime.now(timezone.utc) - last_modified < timedelta(seconds=1):
+        return False
+    return last_modified.replace(microsecond=0) <= since
+
+
+def cache_headers(etag: str, last_modified: Optional[datetime] = None) -> dict:
+    # clients may keep the body but must revalidate before reusing it
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if last_modified is not None:
+        headers["Last-Modified"] = http_date(last_modified)
+    return headers
+
+
+def not_modified(etag: str, last_modified: Optional[datetime] = None) -> Response:
+    return Response(status_code=304, headers=cache_headers(etag, last_modified))
+
+
+def version_etag(updated_at: datetime, *parts: Any) -> str:
+
+    """
+    Strong ETag naming one stored version of a row, so it can go back in If-Match.
+    GETs pass the rest of their validator as `parts` (embedded recipes, links), which rides
+    along as a digest after the updated_at: it changes the tag, but not what If-Match pins.
+    """
+    version = _as_utc(updated_at).isoformat()
+    if parts:
+        version += "/" + hashlib.sha1(repr(parts).encode()).hexdigest()
+    return f'"{version}"'
+
+
+def if_match_version(if_match: Optional[str]) -> Optional[datetime]:
+
+    """
+    The updated_at an If-Match header pins a write to: the ETag from a GET or a previous PATCH
+    (see version_etag), or the updated_at read from a body. None when there is nothing to check
+    (no header, or `*`).
+    Weak or unparsable tags can never match, so they fail with 412 straight away.
+    """
+    if if_match is None or if_match.strip() == "*":
+        return None
+
+    tag = if_match.strip()
+    if tag.startswith("W/") or len(tag) < 2 or tag[0] != '"' or tag[-1] != '"':
+        raise HTTPException(status_code=412, detail="If-Match needs a strong ETag holding updated_at")
+    try:
+        return _as_utc(datetime.fromisoformat(tag[1:-1].split("/", 1)[0].replace("Z", "+00:00")))
+    except ValueError:
+        raise HTTPException(status_code=412, detail="If-Match needs a strong ETag holding updated_at")
+
+
+class ConditionalRequest:
+
+    """
+    Dependency carrying a GET's validators. If-None-Match wins over If-Modified-Since when both are sent.
+    """
+
+    def __init__(self, if_none_match: Optional[str] = Header(None), if_modified_since: Optional[str] = Header(None)):
+        self.if_none_match = if_none_match
+        self.if_modified_since = if_modified_since
+
+    def is_fresh(self, etag: str, last_modified: Optional[datetime] = None) -> bool:
+        if self.if_none_match is not None:
+            return etag_matches(self.if_none_match, etag)
+        return not_modified_since(self.if_modified_since, last_modified)
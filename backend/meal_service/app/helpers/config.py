@@ -1,4 +1,59 @@
 
 from decouple import config
 
-DATABASE_URL = config('DATABASE_URL', default='')
\ No newline at end of file
+DATABASE_URL = config('DATABASE_URL', default='')
+
+# JWT verification (shared with auth_service)
+SECRET_KEY = config('SECRET_KEY', default='')
+ALGORITHM = config('ALGORITHM', default='HS256')
+
+AUTH_SERVICE_URL = config('AUTH_SERVICE_URL', default='http://auth_service:8000/api/auth')
+AUTH_VERIFY_MODE = config('AUTH_VERIFY_MODE', default='local')  # 'local' or 'remote'
+AUTH_REMOTE_FALLBACK = config('AUTH_REMOTE_FALLBACK', cast=bool, default=False)
+
+TOKEN_CACHE_SIZE = config('TOKEN_CACHE_SIZE', cast=int, default=10000)
+TOKEN_CACHE_TTL_SECONDS = config('TOKEN_CACHE_TTL_SECONDS', cast=int, default=300)
+
+# Pooled client used for auth_service calls
+AUTH_HTTP2 = config('AUTH_HTTP2', cast=bool, default=True)
+AUTH_MAX_CONNECTIONS = config('AUTH_MAX_CONNECTIONS', cast=int, default=100)
+AUTH_MAX_KEEPALIVE_CONNECTIONS = config('AUTH_MAX_KEEPALIVE_CONNECTIONS', cast=int, default=20)
+AUTH_KEEPALIVE_EXPIRY_SECONDS = config('AUTH_KEEPALIVE_EXPIRY_SECONDS', cast=float, default=30.0)
+AUTH_TIMEOUT_SECONDS = config('AUTH_TIMEOUT_SECONDS', cast=float, default=5.0)
+AUTH_CONNECT_TIMEOUT_SECONDS = config('AUTH_CONNECT_TIMEOUT_SECONDS', cast=float, default=2.0)
+
+# Database connection pool
+DB_POOL_SIZE = config('DB_POOL_SIZE', cast=int, default=5)
+DB_MAX_OVERFLOW = config('DB_MAX_OVERFLOW', cast=int, default=10)
+DB_POOL_PRE_PING = config('DB_POOL_PRE_PING', cast=bool, default=True)
+DB_POOL_RECYCLE_SECONDS = config('DB_POOL_RECYCLE_SECONDS', cast=int, default=1800)
+DB_ECHO = config('DB_ECHO', cast=bool, default=False)
+
+# Startup readiness wait (python -m shared.ready), run before the server starts
+DB_READY_TIMEOUT_SECONDS = config('DB_READY_TIMEOUT_SECONDS', cast=int, default=60)
+DB_READY_INTERVAL_SECONDS = config('DB_READY_INTERVAL_SECONDS', cast=float, default=1.0)
+
+# List endpoints
+PAGE_SIZE_DEFAULT = config('PAGE_SIZE_DEFAULT', cast=int, default=100)
+PAGE_SIZE_MAX = config('PAGE_SIZE_MAX', cast=int, default=500)
+
+# Bulk import
+BULK_MAX_MEALS = config('BULK_MAX_MEALS', cast=int, default=5000)
+BULK_BATCH_SIZE = config('BULK_BATCH_SIZE', cast=int, default=500)
+
+# Batch link changes (POST /links)
+LINKS_MAX_PAIRS = config('LINKS_MAX_PAIRS', cast=int, default=5000)
+
+# Calendar
+CALENDAR_MAX_DAYS = config('CALENDAR_MAX_DAYS', cast=int, default=93)
+
+# Revoked token ids, polled from the auth service (0 disables polling)
+REVOCATION_SYNC_SECONDS = config('REVOCATION_SYNC_SECONDS', cast=int, default=10)
+REVOCATION_BUCKET_SECONDS = config('REVOCATION_BUCKET_SECONDS', cast=int, default=3600)
+
+# Per-user response cache: 'off', 'local' (one worker only, generations live in process) or 'redis'
+RESPONSE_CACHE_BACKEND = config('RESPONSE_CACHE_BACKEND', default='off')
+RESPONSE_CACHE_MAX_BYTES = config('RESPONSE_CACHE_MAX_BYTES', cast=int, default=64 * 1024 * 1024)
+RESPONSE_CACHE_MAX_ENTRY_BYTES = config('RESPONSE_CACHE_MAX_ENTRY_BYTES', cast=int, default=1024 * 1024)
+RESPONSE_CACHE_TTL_SECONDS = config('RESPONSE_CACHE_TTL_SECONDS', cast=int, default=300)
+RESPONSE_CACHE_REDIS_URL = config('RESPONSE_CACHE_REDIS_URL', default='redis://localhost:6379/0')
@@ -0,0 +1,65 @@
+from collections import defaultdict
+from typing import Iterable, Optional
+from ..db.models import UnitEnum
+
+
+# every unit is summed in the base unit of its dimension
+BASE_UNITS = {
+    UnitEnum.gram: (UnitEnum.gram, 1.0),
+    UnitEnum.kilogram: (UnitEnum.gram, 1000.0),
+    UnitEnum.milliliter: (UnitEnum.milliliter, 1.0),
+    UnitEnum.liter: (UnitEnum.milliliter, 1000.0),
+    UnitEnum.teaspoon: (UnitEnum.milliliter, 5.0),
+    UnitEnum.tablespoon: (UnitEnum.milliliter, 15.0),
+    UnitEnum.cup: (UnitEnum.milliliter, 240.0),
+    UnitEnum.piece: (UnitEnum.piece, 1.0),
+}
+
+# base quantities at or above the threshold are reported in the larger unit
+LARGER_UNITS = {
+    UnitEnum.gram: (UnitEnum.kilogram, 1000.0),
+    UnitEnum.milliliter: (UnitEnum.liter, 1000.0),
+}
+
+
+def to_base_unit(quantity: float, unit: str) -> tuple[UnitEnum, float]:
+    base_unit, factor = BASE_UNITS[UnitEnum(unit)]
+    return base_unit, quantity * factor
+
+
+def for_display(quantity: float, base_unit: UnitEnum) -> tuple[float, UnitEnum]:
+    larger = LARGER_UNITS.get(base_unit)
+    if larger and quantity >= larger[1]:
+        return round(quantity / larger[1], 3), larger[0]
+    return round(quantity, 3), base_unit
+
+
+def ingredient_key(name: str) -> str:
+    return " ".join(name.split()).casefold()
+
+
+class GroceryAggregator:
+
+    """
+    Sums ingredient quantities by (name, dimension) across any number of recipes.
+    Ingredients are plain dicts as stored in RecipeModel.ingredients.
+    """
+
+    def __init__(self):
+        self.totals: dict[tuple[str, UnitEnum], float] = defaultdict(float)
+        self.names: dict[str, str] = {}
+
+    def add(self, ingredients: Optional[Iterable[dict]]) -> None:
+        for ingredient in ingredients or ():
+            key = ingredient_key(ingredient["name"])
+            base_unit, quantity = to_base_unit(ingredient["quantity"], ingredient["unit"])
+            self.totals[key, base_unit] += quantity
+            self.names.setdefault(key, ingredient["name"].strip())
+
+    def items(self, display: bool = True) -> list[dict]:
+        # display=False keeps exact base-unit totals, e.g. for storing in rollups
+        items = []
+        for (key, base_unit), total in sorted(self.totals.items()):
+            quantity, unit = for_display(total, base_unit) if display else (total, base_unit)
+            items.append({"name": self.names[key], "quantity": quantity, "unit": unit})
+        return items
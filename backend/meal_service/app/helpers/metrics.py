@@ -0,0 +1,16 @@
+"""
+Prometheus metrics only the meal service has. The request, SQL and pool metrics, the
+middleware and /metrics rendering are shared with the auth service (backend/shared/metrics.py).
+"""
+from prometheus_client import Histogram
+
+
+AUTH_UPSTREAM_LATENCY = Histogram("auth_upstream_duration_seconds", "Latency of calls to the auth service", ["call", "outcome"])
+VERIFY_LATENCY = Histogram(
+    "auth_verify_duration_seconds", "Time spent authenticating a request", ["mode"],
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5),
+)
+RENDER_LATENCY = Histogram(
+    "response_render_seconds", "Time spent serializing JSON responses",
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1),
+)
@@ -0,0 +1,67 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Callable, Iterable, Optional, Sequence
+from fastapi import HTTPException, status
+from sqlalchemy import and_, or_
+
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    # opaque to clients: base64 of the last row's sort key
+    payload = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, parse: Callable[[Any], Any] = datetime.fromisoformat) -> tuple[Any, int]:
+    # `parse` rebuilds the sort value: datetimes by default, e.g. float for search ranks
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        value, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        return parse(value), int(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+def keyset_after(columns: Sequence[Any], values: Sequence[Any], descending: bool = False):
+
+    """
+    WHERE clause continuing an ORDER BY over (sort column, id) after the given values.
+    """
+    (sort_column, id_column), (sort_value, id_value) = columns, values
+    if descending:
+        return or_(sort_column < sort_value, and_(sort_column == sort_value, id_column < id_value))
+    return or_(sort_column > sort_value, and_(sort_column == sort_value, id_column > id_value))
+
+
+def paginate(rows: Sequence[Any], limit: int, key: Sequence[str]) -> tuple[list, Optional[str]]:
+
+    """
+    Splits the limit + 1 rows fetched for a page into the page and the cursor for the next one.
+    """
+    page = list(rows[:limit])
+    if len(rows) <= limit:
+        return page, None
+
+    last = page[-1]
+    return page, encode_cursor([last[name] for name in key])
+
+
+def parse_fields(fields: Optional[str], allowed: Iterable[str]) -> Optional[list[str]]:
+
+    """
+    Parses a `fields=a,b,c` projection. `id` is always included.
+    Returns None when no projection was asked for.
+    """
+    if not fields:
+        return None
+
+    allowed = list(allowed)
+    requested = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in requested if name not in allowed]
+    if unknown:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Unknown fields: {', '.join(unknown)}")
+
+    return list(dict.fromkeys(["id"] + requested))
@@ -0,0 +1,309 @@
+import json
+import time
+from collections import OrderedDict
+from email.utils import parsedate_to_datetime
+from typing import Optional
+from urllib.parse import parse_qsl, urlencode
+from fastapi import HTTPException
+from starlette.datastructures import Headers
+from .config import (
+    RESPONSE_CACHE_BACKEND,
+    RESPONSE_CACHE_MAX_BYTES,
+    RESPONSE_CACHE_MAX_ENTRY_BYTES,
+    RESPONSE_CACHE_TTL_SECONDS,
+    RESPONSE_CACHE_REDIS_URL,
+)
+from .conditional import ConditionalRequest
+from .security import verify_user
+
+
+class LocalCache:
+
+    """
+    In-process LRU bounded by the total size of the stored bodies.
+    Entries also expire after `ttl` seconds.
+    """
+
+    def __init__(self, max_bytes: int, ttl: int):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple[bytes, float]]" = OrderedDict()
+        self.size = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        value, expires_at = entry
+        if expires_at <= time.time():
+            self._remove(key)
+            return None
+
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: bytes) -> None:
+        if len(value) > self.max_bytes:
+            return
+
+        self._remove(key)
+        self._entries[key] = (value, time.time() + self.ttl)
+        self.size += len(value)
+
+        while self.size > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= len(entry[0])
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.size = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class RedisCache:
+
+    """
+    Shared backend: entries and per-user generations live in Redis, so every worker sees
+    the same invalidations. Needs the optional `redis` package.
+    """
+
+    def __init__(self, url: str, ttl: int):
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise RuntimeError("RESPONSE_CACHE_BACKEND=redis needs the 'redis' package installed")
+
+        self.ttl = ttl
+        self._client = redis.from_url(url)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self._client.get(f"meals:response:{key}")
+
+    async def set(self, key: str, value: bytes) -> None:
+        await self._client.set(f"meals:response:{key}", value, ex=self.ttl)
+
+    async def generation(self, user_id: int) -> int:
+        return int(await self._client.get(f"meals:generation:{user_id}") or 0)
+
+    async def bump(self, user_id: int) -> None:
+        await self._client.incr(f"meals:generation:{user_id}")
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+
+class ResponseCache:
+
+    """
+    Read-through cache of GET responses keyed by (user_id, generation, route, params).
+    Writes bump the user's generation, which makes every older key unreachable at once;
+    the orphaned entries then age out of the LRU.
+    """
+
+    def __init__(self, local: Optional[LocalCache], shared: Optional[RedisCache] = None):
+        self.local = local
+        self.shared = shared
+        self._generations: dict[int, int] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.skipped = 0  # too large to cache
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.local is not None or self.shared is not None
+
+    async def generation(self, user_id: int) -> int:
+        if self.shared is not None:
+            return await self.shared.generation(user_id)
+        return self._generations.get(user_id, 0)
+
+    async def invalidate(self, user_id: int) -> None:
+        self.invalidations += 1
+        if self.shared is not None:
+            await self.shared.bump(user_id)
+        else:
+            self._generations[user_id] = self._generations.get(user_id, 0) + 1
+
+    async def get(self, key: str) -> Optional[bytes]:
+        value = self.local.get(key) if self.local is not None else None
+        if value is None and self.shared is not None:
+            value = await self.shared.get(key)
+            if value is not None and self.local is not None:
+                self.local.set(key, value)
+
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def set(self, key: str, value: bytes) -> None:
+        self.stores += 1
+        if self.local is not None:
+            self.local.set(key, value)
+        if self.shared is not None:
+            await self.shared.set(key, value)
+
+    async def close(self) -> None:
+        if self.shared is not None:
+            await self.shared.close()
+
+    def stats(self) -> dict:
+        stats = {
+            "backend": RESPONSE_CACHE_BACKEND,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "skipped": self.skipped,
+            "invalidations": self.invalidations,
+        }
+        if self.local is not None:
+            stats.update({"entries": len(self.local), "bytes": self.local.size, "evictions": self.local.evictions})
+        return stats
+
+
+def _build_cache() -> ResponseCache:
+    if RESPONSE_CACHE_BACKEND == "local":
+        return ResponseCache(LocalCache(RESPONSE_CACHE_MAX_BYTES, RESPONSE_CACHE_TTL_SECONDS))
+    if RESPONSE_CACHE_BACKEND == "redis":
+        # the local tier is safe here: keys carry the generation read from Redis
+        return ResponseCache(
+            LocalCache(RESPONSE_CACHE_MAX_BYTES, RESPONSE_CACHE_TTL_SECONDS),
+            RedisCache(RESPONSE_CACHE_REDIS_URL, RESPONSE_CACHE_TTL_SECONDS),
+        )
+    return ResponseCache(None)
+
+
+response_cache = _build_cache()
+
+
+def _encode_entry(headers: list[tuple[bytes, bytes]], body: bytes) -> bytes:
+    head = json.dumps([[name.decode("latin-1"), value.decode("latin-1")] for name, value in headers])
+    return head.encode("latin-1") + b"\n" + body
+
+
+def _decode_entry(value: bytes) -> tuple[list[tuple[bytes, bytes]], bytes]:
+    head, body = value.split(b"\n", 1)
+    return [(name.encode("latin-1"), value.encode("latin-1")) for name, value in json.loads(head)], body
+
+
+# validators worth repeating on a 304 served from the cache
+NOT_MODIFIED_HEADERS = {b"etag", b"last-modified", b"cache-control"}
+MUTATING_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+
+class ResponseCacheMiddleware:
+
+    """
+    Caches successful GETs under `prefix` per user and invalidates that user's entries on every one of their
+    POST/PUT/PATCH/DELETE requests. The generation is bumped before the write's response is sent,
+    so no read issued after a write completes can be answered from before it.
+    """
+
+    def __init__(self, app, cache: ResponseCache, prefix: str, exclude: tuple[str, ...] = ()):
+        self.app = app
+        self.cache = cache
+        self.prefix = prefix
+        self.exclude = exclude
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or not self.cache.enabled
+            or not scope["path"].startswith(self.prefix)
+            or scope["path"] in self.exclude
+        ):
+            return await self.app(scope, receive, send)
+
+        headers = Headers(scope=scope)
+        try:
+            user_id = await verify_user(headers.get("authorization", ""))
+        except HTTPException:
+            # let the route produce its own 401
+            return await self.app(scope, receive, send)
+
+        if scope["method"] == "GET":
+            return await self._cached_get(scope, receive, send, headers, user_id)
+        if scope["method"] in MUTATING_METHODS:
+            return await self._invalidating_write(scope, receive, send, user_id)
+        return await self.app(scope, receive, send)
+
+    async def _cached_get(self, scope, receive, send, headers: Headers, user_id: int):
+        params = urlencode(sorted(parse_qsl(scope["query_string"].decode("latin-1"), keep_blank_values=True)))
+        key = f"{user_id}:{await self.cache.generation(user_id)}:{scope['path']}?{params}"
+
+        cached = await self.cache.get(key)
+        if cached is not None:
+            return await self._send_cached(send, headers, *_decode_entry(cached))
+
+        status = None
+        response_headers: list[tuple[bytes, bytes]] = []
+        body = bytearray()
+        too_large = False
+
+        async def capture(message):
+            nonlocal status, response_headers, too_large
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                response_headers = list(message.get("headers", []))
+                message = {**message, "headers": response_headers + [(b"x-cache", b"MISS")]}
+            elif message["type"] == "http.response.body" and status == 200 and not too_large:
+                body.extend(message.get("body", b""))
+                if len(body) > RESPONSE_CACHE_MAX_ENTRY_BYTES:
+                    too_large = True
+                    body.clear()
+            await send(message)
+
+        await self.app(scope, receive, capture)
+
+        if status == 200:
+            if too_large:
+                self.cache.skipped += 1
+            else:
+                await self.cache.set(key, _encode_entry(response_headers, bytes(body)))
+
+    async def _send_cached(self, send, request_headers: Headers, headers: list[tuple[bytes, bytes]], body: bytes):
+        stored = Headers(raw=headers)
+        etag = stored.get("etag")
+        if etag is not None:
+            last_modified = stored.get("last-modified")
+            conditional = ConditionalRequest(request_headers.get("if-none-match"), request_headers.get("if-modified-since"))
+            if conditional.is_fresh(etag, parsedate_to_datetime(last_modified) if last_modified else None):
+                not_modified_headers = [(name, value) for name, value in headers if name in NOT_MODIFIED_HEADERS]
+                await send({"type": "http.response.start", "status": 304, "headers": not_modified_headers + [(b"x-cache", b"HIT")]})
+                await send({"type": "http.response.body", "body": b""})
+                return
+
+        await send({"type": "http.response.start", "status": 200, "headers": headers + [(b"x-cache", b"HIT")]})
+        await send({"type": "http.response.body", "body": body})
+
+    async def _invalidating_write(self, scope, receive, send, user_id: int):
+        invalidated = False
+
+        async def invalidate_first(message):
+            nonlocal invalidated
+            # the route has committed by the time its response starts
+            if message["type"] == "http.response.start" and not invalidated:
+                invalidated = True
+                await self.cache.invalidate(user_id)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, invalidate_first)
+        finally:
+            # failed writes too: some routes commit more than once before they can fail
+            if not invalidated:
+                await self.cache.invalidate(user_id)
@@ -0,0 +1,20 @@
+import time
+import orjson
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import ORJSONResponse
+from .metrics import RENDER_LATENCY
+
+
+class FastJSONResponse(ORJSONResponse):
+
+    """
+    ORJSONResponse that writes aware UTC datetimes with a trailing Z, the way pydantic does.
+    Routes may return it with plain dicts built from rows; anything orjson can't encode
+    natively goes through jsonable_encoder.
+    """
+
+    def render(self, content) -> bytes:
+        started = time.perf_counter()
+        body = orjson.dumps(content, default=jsonable_encoder, option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS)
+        RENDER_LATENCY.observe(time.perf_counter() - started)
+        return body
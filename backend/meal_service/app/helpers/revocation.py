@@ -0,0 +1,70 @@
+import asyncio
+import logging
+from typing import Callable, Optional
+import httpx
+from shared.revocation import RevocationList
+from .auth_client import auth_client
+from .config import REVOCATION_BUCKET_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+class RevocationPoller:
+
+    """
+    Background task pulling new revocations from the auth service into a RevocationList.
+    `on_revoked` runs whenever something new arrived (e.g. to drop cached verifications).
+    """
+
+    def __init__(self, revocations: RevocationList, interval: int, on_revoked: Optional[Callable[[], None]] = None):
+        self.revocations = revocations
+        self.interval = interval
+        self.on_revoked = on_revoked
+        self.failing = False
+        self._task: Optional[asyncio.Task] = None
+
+    async def poll(self) -> int:
+        loaded = 0
+        while True:
+            page = await auth_client.fetch_revocations(self.revocations.last_id)
+            for entry in page["revoked"]:
+                self.revocations.add(entry["jti"], entry["exp"])
+            self.revocations.last_id = page["last_id"]
+            loaded += len(page["revoked"])
+            if not page["revoked"]:
+                break
+
+        if loaded and self.on_revoked is not None:
+            self.on_revoked()
+        self.revocations.expire()
+        return loaded
+
+    async def start(self) -> None:
+        if self.interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.poll()
+                if self.failing:
+                    logger.info("revocation sync recovered")
+                self.failing = False
+            except (httpx.HTTPError, KeyError, ValueError) as exc:
+                # log once per outage rather than every interval
+                if not self.failing:
+                    logger.warning("revocation sync failed (%r), keeping the current list", exc)
+                self.failing = True
+            await asyncio.sleep(self.interval)
+
+
+revocation_list = RevocationList(REVOCATION_BUCKET_SECONDS)
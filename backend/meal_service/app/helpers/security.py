@@ -1,31 +1,97 @@
-import httpx
+import time
 from fastapi import HTTPException, status
+from jose import jwt, JWTError, ExpiredSignatureError
+from typing import Optional
+from .config import SECRET_KEY, ALGORITHM, AUTH_VERIFY_MODE, AUTH_REMOTE_FALLBACK, TOKEN_CACHE_SIZE, TOKEN_CACHE_TTL_SECONDS, REVOCATION_SYNC_SECONDS
+from .token_cache import TokenCache
+from .auth_client import auth_client
+from .revocation import RevocationPoller, revocation_list
+from .metrics import VERIFY_LATENCY
+
+
+token_cache = TokenCache(maxsize=TOKEN_CACHE_SIZE, ttl=TOKEN_CACHE_TTL_SECONDS)
+
+# cached verifications predate the new revocations, so they are dropped whenever some arrive
+revocation_poller = RevocationPoller(revocation_list, REVOCATION_SYNC_SECONDS, on_revoked=token_cache.clear)
+
+
+def _token_exp(token: str) -> Optional[float]:
+    # only used to cap cache lifetime, never to trust the token
+    try:
+        exp = jwt.get_unverified_claims(token).get("exp")
+    except JWTError:
+        return None
+    return float(exp) if exp is not None else None
+
+
+def verify_token_locally(token: str) -> Optional[tuple[int, Optional[float]]]:
+
+    """
+    Checks the signature and expiry of the JWT with the shared SECRET_KEY.
+    Returns (user_id, exp), or None when the token should be re-checked remotely.
+    """
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+
+    except ExpiredSignatureError:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid or expired token")
+
+    except JWTError:
+        if AUTH_REMOTE_FALLBACK:
+            return None
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid or expired token")
+
+    # refresh tokens are only good for the auth service's /refresh
+    if payload.get("typ", "access") != "access":
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid or expired token")
+
+    if revocation_list.is_revoked(payload.get("jti"), payload.get("exp")):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token has been revoked")
+
+    user_id = payload.get("sub")
+    if user_id is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token payload")
+
+    exp = payload.get("exp")
+    return int(user_id), float(exp) if exp is not None else None
+
+
+async def verify_token_remotely(token: str) -> int:
+
+    """
+    Asks the auth service who the token belongs to, over the shared pooled client.
+    """
+    return await auth_client.fetch_user_id(token)
 
-AUTH_SERVICE_URL = "http://auth_service:8000/api/auth"  # replace with your actual auth service URL
 
 async def verify_user(authorization: str) -> int:
 
     """
-    Verifies the JWT token with the auth service and returns the user ID.
+    Verifies the JWT token and returns the user ID.
+    Tokens are checked locally when AUTH_VERIFY_MODE is 'local' (and a SECRET_KEY is set),
+    otherwise by the auth service. Results are cached until the token expires.
     Raises 401 if the token is invalid or expired.
     """
     if not authorization.startswith("Bearer "):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid authorization header")
-    
+
     token = authorization.split(" ")[1]  # extract the token part
 
-    async with httpx.AsyncClient() as client:
-        resp = await client.get(f"{AUTH_SERVICE_URL}/me", headers={"Authorization": f"Bearer {token}"})
-    
-    if resp.status_code != 200:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid or expired token")
-    
-    user_data = resp.json()
-    user_id = user_data.get("id")
-    
-    if user_id is None:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token payload")
-    
-    # return user_id
-    return int(user_id)  # ensure user_id is an int
-    
+    started = time.perf_counter()
+    cached_user_id = token_cache.get(token)
+    if cached_user_id is not None:
+        VERIFY_LATENCY.labels("cache").observe(time.perf_counter() - started)
+        return cached_user_id
+
+    verified = None
+    if AUTH_VERIFY_MODE == "local" and SECRET_KEY:
+        verified = verify_token_locally(token)
+
+    if verified is None:
+        user_id, exp = await verify_token_remotely(token), _token_exp(token)
+    else:
+        user_id, exp = verified
+
+    token_cache.set(token, user_id, exp)
+    VERIFY_LATENCY.labels("remote" if verified is None else "local").observe(time.perf_counter() - started)
+    return user_id
@@ -0,0 +1,63 @@
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Optional
+
+
+class TokenCache:
+
+    """
+    Bounded LRU mapping a token hash to the user id it resolved to.
+    Entries expire after `ttl` seconds or at the token's own `exp`, whichever comes first.
+    """
+
+    def __init__(self, maxsize: int, ttl: int):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[bytes, tuple[int, float]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        # never keep raw tokens in memory
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> Optional[int]:
+        key = self._key(token)
+        entry = self._entries.get(key)
+
+        if entry is None:
+            self.misses += 1
+            return None
+
+        user_id, expires_at = entry
+        if expires_at <= time.time():
+            del self._entries[key]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return user_id
+
+    def set(self, token: str, user_id: int, exp: Optional[float] = None) -> None:
+        if self.maxsize <= 0:
+            return
+
+        expires_at = time.time() + self.ttl
+        if exp is not None:
+            expires_at = min(expires_at, exp)
+
+        key = self._key(token)
+        self._entries[key] = (user_id, expires_at)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
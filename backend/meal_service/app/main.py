@@ -1,25 +1,69 @@
-from fastapi import FastAPI,APIRouter
+from fastapi import FastAPI,APIRouter,Response
 from .api.meal_routes import router as meal_router
 from contextlib import asynccontextmanager
-from .db.session import init_db
+from .db.session import engine
+from .helpers.auth_client import auth_client
+from .helpers.security import token_cache, revocation_poller
+from .helpers.revocation import revocation_list
+from .helpers.response_cache import response_cache, ResponseCacheMiddleware
+from .helpers.responses import FastJSONResponse
+from shared.metrics import MetricsMiddleware, StatsCollector, instrument_engine, register_collector, render_metrics
 
 
 
 @asynccontextmanager
 async def lifespan(app:FastAPI):
-    init_db()
+    # schema changes are applied beforehand by `alembic upgrade head` (see docker-compose)
+    await auth_client.start()
+    await revocation_poller.start()
     yield
+    await revocation_poller.stop()
+    await response_cache.close()
+    await auth_client.close()
+    await engine.dispose()
 
 
 app = FastAPI(
     title = "meal-service",
     version = "1.0.0",
     description = "Meals microservice with FastAPI",
+    default_response_class=FastJSONResponse,
     lifespan=lifespan
 )
 
 app.include_router(meal_router, prefix = "/api/meals",tags=["meals"])
 
+# streamed exports are never buffered into the cache
+app.add_middleware(ResponseCacheMiddleware, cache=response_cache, prefix="/api/meals", exclude=("/api/meals/export",))
+# outermost, so cache hits are timed too
+app.add_middleware(MetricsMiddleware, routes=app.routes)
+
+instrument_engine(engine)
+
 @app.get("/health")
 async def health_check():
-    return {"status":"ok","service":"auth"}
\ No newline at end of file
+    return {"status":"ok","service":"auth"}
+
+
+def service_stats() -> dict:
+    return {
+        "auth_client": auth_client.stats(),
+        "token_cache": {"size": len(token_cache), "hits": token_cache.hits, "misses": token_cache.misses},
+        "response_cache": response_cache.stats(),
+        "revocations": {"size": len(revocation_list), "last_id": revocation_list.last_id, "sync_failing": revocation_poller.failing},
+    }
+
+
+# the /stats numbers, as gauges (meal_auth_client_pool_hits, meal_response_cache_entries, ...)
+register_collector(StatsCollector(meal=service_stats))
+
+
+@app.get("/stats")
+async def stats():
+    return service_stats()
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    body, media_type = render_metrics()
+    return Response(body, media_type=media_type)
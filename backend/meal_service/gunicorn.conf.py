@@ -0,0 +1,20 @@
+"""
+Production server: gunicorn managing uvicorn workers. Picked up from the working directory,
+
+    python -m shared.ready && gunicorn app.main:app
+
+(the image's default command). The common settings and hooks are in shared/gunicorn_conf.py.
+"""
+import decouple
+from shared.gunicorn_conf import *  # noqa: F401,F403
+from shared.gunicorn_conf import reset_multiproc_dir, workers
+
+
+bind = f"0.0.0.0:{decouple.config('PORT', default=8001)}"
+
+reset_multiproc_dir("/tmp/prometheus_meal")
+
+
+if decouple.config('RESPONSE_CACHE_BACKEND', default='off') == "local" and workers > 1:
+    # each worker would keep its own generations, so a write in one leaves stale entries in the others
+    raise RuntimeError("RESPONSE_CACHE_BACKEND=local only works with one worker; use 'redis' or 'off', or GUNICORN_WORKERS=1")
@@ -0,0 +1,68 @@
+"""initial meal schema
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 00:00:00
+
+Matches the tables previously created by SQLModel.metadata.create_all.
+Tables that already exist (databases created before Alembic) are left as they are.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0001"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _has_table(name: str) -> bool:
+    return sa.inspect(op.get_bind()).has_table(name)
+
+
+def upgrade() -> None:
+    if not _has_table("mealmodel"):
+        op.create_table(
+            "mealmodel",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("user_id", sa.Integer(), nullable=False),
+            sa.Column("name", sa.String(), nullable=False),
+            sa.Column("date", sa.DateTime(), nullable=False),
+            sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+            sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+            sa.PrimaryKeyConstraint("id"),
+        )
+
+    if not _has_table("recipemodel"):
+        op.create_table(
+            "recipemodel",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("user_id", sa.Integer(), nullable=False),
+            sa.Column("title", sa.String(), nullable=False),
+            sa.Column("ingredients", sa.JSON(), nullable=True),
+            sa.Column("instructions", sa.String(), nullable=True),
+            sa.Column("calories", sa.Float(), nullable=True),
+            sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+            sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+            sa.PrimaryKeyConstraint("id"),
+        )
+
+    if not _has_table("mealrecipelink"):
+        op.create_table(
+            "mealrecipelink",
+            sa.Column("meal_id", sa.Integer(), nullable=False),
+            sa.Column("recipe_id", sa.Integer(), nullable=False),
+            sa.ForeignKeyConstraint(["meal_id"], ["mealmodel.id"]),
+            sa.ForeignKeyConstraint(["recipe_id"], ["recipemodel.id"]),
+            sa.PrimaryKeyConstraint("meal_id", "recipe_id"),
+        )
+
+
+def downgrade() -> None:
+    op.drop_table("mealrecipelink")
+    op.drop_table("recipemodel")
+    op.drop_table("mealmodel")
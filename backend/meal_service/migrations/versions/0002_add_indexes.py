@@ -0,0 +1,41 @@
+"""add lookup indexes
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 00:00:01
+
+Indexes for the per-user and per-recipe lookups done by meal_routes.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+INDEXES = [
+    ("ix_mealmodel_user_id_date", "mealmodel", ["user_id", "date"]),
+    ("ix_recipemodel_user_id", "recipemodel", ["user_id"]),
+    ("ix_mealrecipelink_recipe_id", "mealrecipelink", ["recipe_id"]),
+]
+
+
+def _has_index(table: str, name: str) -> bool:
+    return any(index["name"] == name for index in sa.inspect(op.get_bind()).get_indexes(table))
+
+
+def upgrade() -> None:
+    for name, table, columns in INDEXES:
+        if not _has_index(table, name):
+            op.create_index(name, table, columns)
+
+
+def downgrade() -> None:
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,29 @@
+"""index recipes by (user_id, updated_at)
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 00:00:02
+
+GET /user/recipes pages through a user's recipes ordered by (updated_at, id).
+The composite index also covers the plain user_id lookups, so it replaces ix_recipemodel_user_id.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_recipemodel_user_id_updated_at", "recipemodel", ["user_id", "updated_at"])
+    op.drop_index("ix_recipemodel_user_id", table_name="recipemodel")
+
+
+def downgrade() -> None:
+    op.create_index("ix_recipemodel_user_id", "recipemodel", ["user_id"])
+    op.drop_index("ix_recipemodel_user_id_updated_at", table_name="recipemodel")
@@ -0,0 +1,37 @@
+"""daily rollup table
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 00:00:03
+
+Creates dailyrollup. Populate it for existing data with `python -m app.db.rollups rebuild`.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0004"
+down_revision: Union[str, None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "dailyrollup",
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("meal_count", sa.Integer(), nullable=False),
+        sa.Column("recipe_count", sa.Integer(), nullable=False),
+        sa.Column("calories", sa.Float(), nullable=False),
+        sa.Column("ingredients", sa.JSON(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint("user_id", "day"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("dailyrollup")
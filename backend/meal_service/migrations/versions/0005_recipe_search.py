@@ -0,0 +1,40 @@
+"""recipe search indexes
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 00:00:04
+
+GIN indexes behind GET /user/recipes/search: a tsvector over title + instructions and the
+lower-cased ingredient names. PostgreSQL only; other databases search in Python.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# RECIPE_SEARCH_VECTOR / RECIPE_INGREDIENT_NAMES as of this revision (0006 drops the ::jsonb cast)
+SEARCH_VECTOR = "to_tsvector('english', coalesce(title, '') || ' ' || coalesce(instructions, ''))"
+INGREDIENT_NAMES = "(lower(jsonb_path_query_array(ingredients::jsonb, '$[*].name')::text)::jsonb)"
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0005"
+down_revision: Union[str, None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        return
+
+    op.create_index("ix_recipemodel_search", "recipemodel", [sa.text(SEARCH_VECTOR)], postgresql_using="gin")
+    op.create_index("ix_recipemodel_ingredient_names", "recipemodel", [sa.text(INGREDIENT_NAMES)], postgresql_using="gin")
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        return
+
+    op.drop_index("ix_recipemodel_ingredient_names", table_name="recipemodel")
+    op.drop_index("ix_recipemodel_search", table_name="recipemodel")
@@ -0,0 +1,55 @@
+"""recipe ingredients as jsonb
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 00:00:05
+
+Converts recipemodel.ingredients from json to jsonb in place (existing rows are cast by
+the ALTER), rebuilds the ingredient names index without its ::jsonb cast and adds a
+jsonb_path_ops GIN index for containment queries. PostgreSQL only; SQLite keeps JSON.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# RECIPE_INGREDIENT_NAMES before and after this revision
+JSON_INGREDIENT_NAMES = "(lower(jsonb_path_query_array(ingredients::jsonb, '$[*].name')::text)::jsonb)"
+JSONB_INGREDIENT_NAMES = "(lower(jsonb_path_query_array(ingredients, '$[*].name')::text)::jsonb)"
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0006"
+down_revision: Union[str, None] = "0005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        return
+
+    op.drop_index("ix_recipemodel_ingredient_names", table_name="recipemodel")
+    op.alter_column(
+        "recipemodel", "ingredients",
+        type_=postgresql.JSONB(), existing_type=sa.JSON(), postgresql_using="ingredients::jsonb",
+    )
+    op.create_index("ix_recipemodel_ingredient_names", "recipemodel", [sa.text(JSONB_INGREDIENT_NAMES)], postgresql_using="gin")
+    op.create_index(
+        "ix_recipemodel_ingredients", "recipemodel", ["ingredients"],
+        postgresql_using="gin", postgresql_ops={"ingredients": "jsonb_path_ops"},
+    )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        return
+
+    op.drop_index("ix_recipemodel_ingredients", table_name="recipemodel")
+    op.drop_index("ix_recipemodel_ingredient_names", table_name="recipemodel")
+    op.alter_column(
+        "recipemodel", "ingredients",
+        type_=sa.JSON(), existing_type=postgresql.JSONB(), postgresql_using="ingredients::json",
+    )
+    op.create_index("ix_recipemodel_ingredient_names", "recipemodel", [sa.text(JSON_INGREDIENT_NAMES)], postgresql_using="gin")
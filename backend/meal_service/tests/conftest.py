@@ -0,0 +1,67 @@
+import os
+import sys
+import time
+
+# backend/, for the `shared` package the images copy next to `app`
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+
+# set before anything imports the app: a throwaway database and the in-process response cache
+os.environ["DATABASE_URL"] = "sqlite://"
+os.environ["SECRET_KEY"] = "test"
+os.environ["AUTH_VERIFY_MODE"] = "local"
+os.environ["REVOCATION_SYNC_SECONDS"] = "0"
+os.environ["RESPONSE_CACHE_BACKEND"] = "local"
+
+import httpx
+import pytest
+from jose import jwt
+from sqlmodel import SQLModel
+
+from app.main import app
+from app.db.session import engine
+from app.helpers.config import ALGORITHM, SECRET_KEY
+from app.helpers.response_cache import response_cache
+
+
+INGREDIENTS = [{"name": "salt", "quantity": 1, "unit": "tsp"}]
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+def auth():
+    # auth(user_id) -> headers carrying a token the service verifies locally
+    def headers(user_id: int) -> dict:
+        token = jwt.encode({"sub": str(user_id), "exp": int(time.time()) + 600}, SECRET_KEY, algorithm=ALGORITHM)
+        return {"Authorization": f"Bearer {token}"}
+    return headers
+
+
+@pytest.fixture
+async def client():
+    # every test starts from empty tables and an empty cache
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.drop_all)
+        await conn.run_sync(SQLModel.metadata.create_all)
+    response_cache.local.clear()
+    response_cache._generations.clear()
+
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test/api/meals") as client:
+            yield client
+
+
+@pytest.fixture
+def meal_with_recipes(client, auth):
+    # meal_with_recipes(recipes, ...) -> (meal_id, recipe_ids), created through the API
+    async def create(recipes: int = 1, name: str = "dinner", user_id: int = 1) -> tuple[int, list[int]]:
+        meal_id = (await client.post("/create", headers=auth(user_id), json={"name": name})).json()["id"]
+        recipe_ids = []
+        for index in range(recipes):
+            response = await client.post(f"/{meal_id}/recipe/create", headers=auth(user_id), json={"title": f"recipe {index}", "ingredients": INGREDIENTS})
+            recipe_ids.append(response.json()["id"])
+        return meal_id, recipe_ids
+    return create
@@ -0,0 +1,61 @@
+import pytest
+
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_meal_etag_is_accepted_by_patch(client, auth, meal_with_recipes):
+    meal_id, _ = await meal_with_recipes()
+    etag = (await client.get(f"/{meal_id}", headers=auth(1))).headers["etag"]
+    assert not etag.startswith("W/")
+
+    response = await client.patch(f"/{meal_id}", headers={**auth(1), "If-Match": etag}, json={"name": "supper"})
+    assert response.status_code == 200
+
+    response = await client.patch(f"/{meal_id}", headers={**auth(1), "If-Match": etag}, json={"name": "late supper"})
+    assert response.status_code == 412
+
+
+async def test_recipe_etag_is_accepted_by_patch(client, auth, meal_with_recipes):
+    meal_id, (recipe_id,) = await meal_with_recipes()
+    etag = (await client.get(f"/{meal_id}/recipe/{recipe_id}", headers=auth(1))).headers["etag"]
+    assert not etag.startswith("W/")
+
+    response = await client.patch(f"/{meal_id}/recipe/{recipe_id}", headers={**auth(1), "If-Match": etag}, json={"title": "stew"})
+    assert response.status_code == 200
+
+    response = await client.patch(f"/user/recipe/{recipe_id}", headers={**auth(1), "If-Match": etag}, json={"title": "broth"})
+    assert response.status_code == 412
+
+
+async def test_meal_etag_changes_with_its_recipes(client, auth, meal_with_recipes):
+    # editing a recipe leaves the meal row alone, but not the meal's representation
+    meal_id, (recipe_id,) = await meal_with_recipes()
+    etag = (await client.get(f"/{meal_id}", headers=auth(1))).headers["etag"]
+
+    await client.patch(f"/user/recipe/{recipe_id}", headers=auth(1), json={"title": "stew"})
+
+    response = await client.get(f"/{meal_id}", headers={**auth(1), "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["recipes"][0]["title"] == "stew"
+
+    response = await client.patch(f"/{meal_id}", headers={**auth(1), "If-Match": etag}, json={"name": "supper"})
+    assert response.status_code == 200
+
+
+@pytest.mark.parametrize("path", ["/{meal_id}", "/{meal_id}/recipe/{recipe_id}", "/user/recipe/{recipe_id}"])
+async def test_patch_etag_matches_get(client, auth, meal_with_recipes, path):
+    meal_id, (recipe_id,) = await meal_with_recipes()
+    url = path.format(meal_id=meal_id, recipe_id=recipe_id)
+    body = {"name": "supper"} if path == "/{meal_id}" else {"title": "stew"}
+    patched = await client.patch(url, headers=auth(1), json=body)
+    etag = patched.headers["etag"]
+
+    get_url = f"/{meal_id}" if path == "/{meal_id}" else f"/{meal_id}/recipe/{recipe_id}"
+    response = await client.get(get_url, headers=auth(1))
+    assert response.headers["etag"] == etag
+    response = await client.get(get_url, headers={**auth(1), "If-None-Match": etag})
+    assert response.status_code == 304
+
+    response = await client.patch(url, headers={**auth(1), "If-Match": etag}, json=body)
+    assert response.status_code == 200
@@ -0,0 +1,53 @@
+import pytest
+
+from shared.query_counter import assert_max_queries
+from app.db.session import engine
+
+
+pytestmark = pytest.mark.anyio
+
+RECIPES = 5
+
+
+@pytest.fixture
+async def meal_id(meal_with_recipes):
+    # enough recipes that a per-recipe query would show up in the counts
+    meal_id, _ = await meal_with_recipes(RECIPES)
+    return meal_id
+
+
+async def test_get_meal(client, auth, meal_id):
+    # validator, meal, its recipes, their meal ids
+    with assert_max_queries(engine, 4):
+        response = await client.get(f"/{meal_id}", headers=auth(1))
+
+    assert response.status_code == 200
+    assert len(response.json()["recipes"]) == RECIPES
+
+
+async def test_get_meal_not_modified(client, auth, meal_id):
+    etag = (await client.get(f"/{meal_id}", headers=auth(1))).headers["etag"]
+    await client.post("/create", headers=auth(1), json={"name": "snack"})  # clears the response cache
+
+    with assert_max_queries(engine, 1):
+        response = await client.get(f"/{meal_id}", headers={**auth(1), "If-None-Match": etag})
+
+    assert response.status_code == 304
+
+
+async def test_get_meal_recipes(client, auth, meal_id):
+    # validator, recipes, their meal ids
+    with assert_max_queries(engine, 3):
+        response = await client.get(f"/{meal_id}/recipes", headers=auth(1))
+
+    assert response.status_code == 200
+    assert len(response.json()) == RECIPES
+
+
+async def test_get_user_recipes(client, auth, meal_id):
+    # validator, one page of recipes, their meal ids
+    with assert_max_queries(engine, 3):
+        response = await client.get("/user/recipes", headers=auth(1))
+
+    assert response.status_code == 200
+    assert len(response.json()) == RECIPES
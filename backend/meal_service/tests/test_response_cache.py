@@ -0,0 +1,107 @@
+import pytest
+
+from app.api import meal_routes
+from app.helpers import response_cache as response_cache_module
+from app.helpers.response_cache import response_cache
+
+
+pytestmark = pytest.mark.anyio
+
+
+async def cached_get(client, auth, url: str, user_id: int = 1):
+    # the second GET is the one that can come from the cache
+    await client.get(url, headers=auth(user_id))
+    response = await client.get(url, headers=auth(user_id))
+    assert response.headers["x-cache"] == "HIT"
+    return response
+
+
+async def test_get_is_cached(client, auth):
+    await client.post("/create", headers=auth(1), json={"name": "breakfast"})
+
+    first = await client.get("/all", headers=auth(1))
+    second = await client.get("/all", headers=auth(1))
+
+    assert first.headers["x-cache"] == "MISS"
+    assert second.headers["x-cache"] == "HIT"
+    assert second.json() == first.json()
+
+
+async def test_post_invalidates(client, auth):
+    await client.post("/create", headers=auth(1), json={"name": "breakfast"})
+    await cached_get(client, auth, "/all")
+
+    await client.post("/create", headers=auth(1), json={"name": "lunch"})
+
+    response = await client.get("/all", headers=auth(1))
+    assert response.headers["x-cache"] == "MISS"
+    assert {meal["name"] for meal in response.json()} == {"breakfast", "lunch"}
+
+
+async def test_patch_invalidates(client, auth):
+    meal_id = (await client.post("/create", headers=auth(1), json={"name": "breakfast"})).json()["id"]
+    await cached_get(client, auth, f"/{meal_id}")
+
+    response = await client.patch(f"/{meal_id}", headers=auth(1), json={"name": "brunch"})
+    assert response.status_code == 200
+
+    response = await client.get(f"/{meal_id}", headers=auth(1))
+    assert response.headers["x-cache"] == "MISS"
+    assert response.json()["name"] == "brunch"
+
+
+async def test_delete_invalidates(client, auth, meal_with_recipes):
+    meal_id, _ = await meal_with_recipes()
+    await cached_get(client, auth, f"/{meal_id}/recipes")
+    await cached_get(client, auth, "/user/recipes")
+
+    response = await client.delete(f"/{meal_id}", headers=auth(1))
+    assert response.status_code == 204
+
+    assert (await client.get(f"/{meal_id}/recipes", headers=auth(1))).status_code == 404
+    assert (await client.get("/user/recipes", headers=auth(1))).json() == []
+
+
+async def test_write_leaves_other_users_entries(client, auth):
+    await client.post("/create", headers=auth(1), json={"name": "mine"})
+    await client.post("/create", headers=auth(2), json={"name": "theirs"})
+    theirs = await cached_get(client, auth, "/all", user_id=2)
+
+    await client.post("/create", headers=auth(1), json={"name": "another"})
+
+    response = await client.get("/all", headers=auth(2))
+    assert response.headers["x-cache"] == "HIT"
+    assert response.json() == theirs.json()
+    assert (await client.get("/all", headers=auth(1))).headers["x-cache"] == "MISS"
+
+
+async def test_large_bodies_are_not_cached(client, auth, monkeypatch):
+    await client.post("/create", headers=auth(1), json={"name": "x" * 200})
+    monkeypatch.setattr(response_cache_module, "RESPONSE_CACHE_MAX_ENTRY_BYTES", 100)
+    skipped = response_cache.skipped
+
+    first = await client.get("/all", headers=auth(1))
+    second = await client.get("/all", headers=auth(1))
+
+    assert len(first.content) > 100
+    assert second.headers["x-cache"] == "MISS"
+    assert second.json() == first.json()
+    assert response_cache.skipped == skipped + 2
+    assert len(response_cache.local) == 0
+
+
+async def test_write_failing_after_commit_invalidates(client, auth, monkeypatch):
+    await client.post("/create", headers=auth(1), json={"name": "breakfast"})
+    await cached_get(client, auth, "/all")
+
+    def fail(**fields):
+        raise RuntimeError("response model failed")
+
+    # create_meal builds its response after the commit
+    monkeypatch.setattr(meal_routes, "GetMeal", fail)
+    with pytest.raises(RuntimeError):
+        await client.post("/create", headers=auth(1), json={"name": "lunch"})
+
+    response = await client.get("/all", headers=auth(1))
+    assert response.headers["x-cache"] == "MISS"
+    assert {meal["name"] for meal in response.json()} == {"breakfast", "lunch"}
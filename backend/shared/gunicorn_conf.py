@@ -0,0 +1,70 @@
+"""
+gunicorn settings and hooks both services start from. Each service's gunicorn.conf.py does
+
+    from shared.gunicorn_conf import *
+
+then sets its port and calls reset_multiproc_dir. Settings come from the environment or .env
+like the app's own; gunicorn reads every module-level name matching one of its settings
+(unknown names are ignored), hence `decouple.config` rather than `config`, itself a setting.
+"""
+import os
+import shutil
+import decouple
+
+
+def cpu_count() -> int:
+    # CPUs this container may run on, not the host's
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# async workers: one per CPU. Each holds its own pool of DB_POOL_SIZE + DB_MAX_OVERFLOW connections.
+# GUNICORN_WORKERS rather than WEB_CONCURRENCY, which gunicorn itself parses (and fails on when empty)
+workers = int(decouple.config('GUNICORN_WORKERS', default='') or cpu_count())  # empty counts as unset
+
+# import the app once in the master so workers fork with it loaded; see post_fork for the engine
+preload_app = True
+
+# recycle workers now and then (bounds slow leaks); jitter keeps them from restarting together
+max_requests = decouple.config('GUNICORN_MAX_REQUESTS', cast=int, default=10000)
+max_requests_jitter = decouple.config('GUNICORN_MAX_REQUESTS_JITTER', cast=int, default=1000)
+
+# a worker silent for `timeout` is killed; on shutdown or recycle in-flight requests get graceful_timeout
+timeout = decouple.config('GUNICORN_TIMEOUT', cast=int, default=60)
+graceful_timeout = decouple.config('GUNICORN_GRACEFUL_TIMEOUT', cast=int, default=30)
+keepalive = decouple.config('GUNICORN_KEEPALIVE', cast=int, default=5)
+
+# heartbeat files on tmpfs, a disk-backed /tmp can stall workers past `timeout`
+worker_tmp_dir = "/dev/shm" if os.path.isdir("/dev/shm") else None
+
+accesslog = "-"
+errorlog = "-"
+
+
+def reset_multiproc_dir(default: str) -> None:
+
+    """
+    /metrics across workers (shared/metrics.py). Set from the config file so only this server runs
+    prometheus_client in multiprocess mode, and emptied before the preloaded app creates its metric
+    files, since files from a previous run would be summed into this one's.
+    """
+    os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", default)
+    shutil.rmtree(os.environ["PROMETHEUS_MULTIPROC_DIR"], ignore_errors=True)
+    os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"])
+
+
+def post_fork(server, worker):
+    # the engine was created in the master (preload); give this worker a fresh pool of its own
+    # without closing anything the master or its siblings might hold
+    from app.db.session import engine
+    engine.sync_engine.dispose(close=False)
+
+
+def child_exit(server, worker):
+    # drops the dead worker's live gauges (in-flight requests); its counters keep counting in the totals
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,227 @@
+"""
+Prometheus metrics both services share, served by each at /metrics.
+
+MetricsMiddleware times every request by route template. Engine events count and time the
+SQL each request runs; pool gauges and the ones registered with register_collector are read
+only when /metrics is scraped. Each service's own metrics live in its app/helpers/metrics.py.
+"""
+import os
+import re
+import time
+from contextvars import ContextVar
+from typing import Optional
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+from prometheus_client.core import GaugeMetricFamily
+from sqlalchemy import event
+
+
+REQUESTS = Counter("http_requests_total", "Requests handled", ["method", "route", "status"])
+REQUEST_LATENCY = Histogram("http_request_duration_seconds", "Request latency", ["method", "route"])
+IN_PROGRESS = Gauge("http_requests_in_progress", "Requests being handled", ["method", "route"], multiprocess_mode="livesum")
+
+REQUEST_QUERIES = Histogram(
+    "db_queries_per_request", "SQL statements run by one request", ["route"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 50, 100),
+)
+REQUEST_DB_TIME = Histogram("db_request_time_seconds", "Time one request spent in SQL", ["route"])
+QUERY_LATENCY = Histogram("db_query_duration_seconds", "Latency of single SQL statements")
+POOL_CHECKOUTS = Counter("db_pool_checkouts_total", "Connections checked out of the pool")
+
+class RequestStats:
+
+    __slots__ = ("queries", "db_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+
+
+# set by MetricsMiddleware; SQLAlchemy's greenlets inherit it, so engine events see the request's stats
+current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # kept on the statement's own context, so a statement that fails leaves nothing behind
+    context._query_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context._query_started
+    QUERY_LATENCY.observe(elapsed)
+
+    stats = current_request.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_seconds += elapsed
+
+
+def _checkout(dbapi_connection, connection_record, connection_proxy):
+    POOL_CHECKOUTS.inc()
+
+
+class PoolCollector:
+
+    """
+    Pool gauges read at scrape time (StaticPool, used for in-memory SQLite, has none of them).
+    """
+
+    def __init__(self, engine):
+        self.pool = engine.sync_engine.pool
+
+    def collect(self):
+        for name, documentation in (
+            ("size", "Configured pool size"),
+            ("checkedout", "Connections in use"),
+            ("checkedin", "Idle connections in the pool"),
+            ("overflow", "Connections opened beyond the pool size"),
+        ):
+            reading = getattr(self.pool, name, None)
+            if reading is not None:
+                yield GaugeMetricFamily(f"db_pool_{name}", documentation, value=reading())
+
+
+class StatsCollector:
+
+    """
+    Exposes the numbers behind /stats (caches, revocation sync) as gauges.
+    """
+
+    def __init__(self, **sources):
+        self.sources = sources  # prefix -> callable returning a (possibly nested) dict of numbers
+
+    def _flatten(self, prefix: str, values: dict):
+        for name, value in values.items():
+            if isinstance(value, dict):
+                yield from self._flatten(f"{prefix}_{name}", value)
+            elif isinstance(value, (bool, int, float)):
+                yield f"{prefix}_{name}", float(value)
+
+    def collect(self):
+        for prefix, read in self.sources.items():
+            for name, value in self._flatten(prefix, read()):
+                yield GaugeMetricFamily(name, f"{name} (see /stats)", value=value)
+
+
+def instrument_engine(engine) -> None:
+    sync_engine = engine.sync_engine
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(sync_engine.pool, "checkout", _checkout)
+    register_collector(PoolCollector(engine))
+
+
+# collectors read at scrape time; they describe the process that answers the scrape
+_collectors: list = []
+_registry: Optional[CollectorRegistry] = None
+
+
+def register_collector(collector) -> None:
+    REGISTRY.register(collector)
+    _collectors.append(collector)
+
+
+def _scrape_registry() -> CollectorRegistry:
+
+    """
+    Under gunicorn with PROMETHEUS_MULTIPROC_DIR set (see shared/gunicorn_conf.py), every worker writes
+    its samples to files there and whichever worker answers /metrics sums them.
+    """
+    global _registry
+    if _registry is None:
+        if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+            _registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(_registry)
+            for collector in _collectors:
+                _registry.register(collector)
+        else:
+            _registry = REGISTRY
+    return _registry
+
+
+def render_metrics() -> tuple[bytes, str]:
+    return generate_latest(_scrape_registry()), CONTENT_TYPE_LATEST
+
+
+PATH_PARAM = re.compile(r"\(\?P<\w+>")
+
+
+class RouteLabels:
+
+    """
+    Maps a request path to its route template, the way the router would pick it.
+    Matching each route in turn costs ~60µs per request on this app, so the route regexes are
+    folded into one alternation per method (compiled on first use), which keeps route order.
+    Paths with no route for their method get the template of any route matching the path (405s).
+    """
+
+    def __init__(self, routes: list):
+        self.routes = routes  # the application's route list, read on first use
+        self.patterns: dict[Optional[str], tuple[re.Pattern, list[str]]] = {}
+
+    def _compile(self, method: Optional[str]) -> tuple[re.Pattern, list[str]]:
+        paths, alternatives = [], []
+        for route in self.routes:
+            regex, methods = getattr(route, "path_regex", None), getattr(route, "methods", None)
+            if regex is None or (method is not None and methods is not None and method not in methods):
+                continue
+            # drop the anchors and the parameter names, which repeat across routes
+            body = PATH_PARAM.sub("(?:", regex.pattern.removeprefix("^").removesuffix("$"))
+            alternatives.append(f"(?P<r{len(paths)}>{body})")
+            paths.append(route.path)
+        return re.compile(f"^(?:{'|'.join(alternatives)})$"), paths
+
+    def _match(self, method: Optional[str], path: str) -> Optional[str]:
+        if method not in self.patterns:
+            self.patterns[method] = self._compile(method)
+        pattern, paths = self.patterns[method]
+        if not paths:
+            return None
+        match = pattern.match(path)
+        return paths[int(match.lastgroup[1:])] if match else None
+
+    def __call__(self, method: str, path: str) -> str:
+        return self._match(method, path) or self._match(None, path) or "unmatched"
+
+
+class MetricsMiddleware:
+
+    """
+    Pure ASGI middleware recording latency, status and in-flight requests per route template
+    (/api/meals/{meal_id}, not the raw path), plus the request's SQL count and time.
+    Add it last, so that it also times what other middleware answers on its own.
+    """
+
+    def __init__(self, app, routes: list):
+        self.app = app
+        self.route_labels = RouteLabels(routes)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        method = scope["method"]
+        route = self.route_labels(method, scope["path"])
+        status = 500
+
+        async def record_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        stats = RequestStats()
+        token = current_request.set(stats)
+        in_progress = IN_PROGRESS.labels(method, route)
+        in_progress.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, record_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            in_progress.dec()
+            current_request.reset(token)
+
+            REQUESTS.labels(method, route, str(status)).inc()
+            REQUEST_LATENCY.labels(method, route).observe(elapsed)
+            REQUEST_QUERIES.labels(route).observe(stats.queries)
+            REQUEST_DB_TIME.labels(route).observe(stats.db_seconds)
@@ -0,0 +1,48 @@
+from contextlib import contextmanager
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+
+class QueryCounter:
+
+    """
+    Counts the SQL statements an engine executes while active.
+
+        with QueryCounter(engine) as counter:
+            ...
+        assert counter.count <= 3, counter.statements
+    """
+
+    def __init__(self, engine):
+        self.engine = engine.sync_engine if isinstance(engine, AsyncEngine) else engine
+        self.statements: list[str] = []
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self._before_cursor_execute)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, "before_cursor_execute", self._before_cursor_execute)
+        return False
+
+
+@contextmanager
+def assert_max_queries(engine, limit: int):
+
+    """
+    Fails with the offending statements when more than `limit` queries run inside the block.
+    """
+    with QueryCounter(engine) as counter:
+        yield counter
+
+    if counter.count > limit:
+        raise AssertionError(
+            f"expected at most {limit} queries, got {counter.count}:\n" + "\n".join(counter.statements)
+        )
@@ -0,0 +1,43 @@
+"""
+Waits until the service's database accepts connections, then exits 0 (1 after
+DB_READY_TIMEOUT_SECONDS). Runs in the service's directory, before the server, so workers
+never start against a database that is still coming up:
+
+    python -m shared.ready && gunicorn app.main:app
+"""
+import asyncio
+import sys
+import time
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+
+
+async def wait_for_database(engine, timeout: float, interval: float) -> bool:
+
+    deadline = time.monotonic() + timeout
+    attempt = 0
+    try:
+        while True:
+            attempt += 1
+            try:
+                async with engine.connect() as conn:
+                    await conn.execute(text("SELECT 1"))
+                print(f"database ready after {attempt} attempt(s)")
+                return True
+            except (OSError, SQLAlchemyError, asyncio.TimeoutError) as exc:
+                if time.monotonic() + interval > deadline:
+                    print(f"database not ready after {timeout}s: {exc!r}", file=sys.stderr)
+                    return False
+                print(f"waiting for database ({exc.__class__.__name__})")
+                await asyncio.sleep(interval)
+    finally:
+        # nothing pooled here may outlive this process
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    # whichever service's `app` is importable from here
+    from app.db.session import engine
+    from app.helpers.config import DB_READY_TIMEOUT_SECONDS, DB_READY_INTERVAL_SECONDS
+
+    sys.exit(0 if asyncio.run(wait_for_database(engine, DB_READY_TIMEOUT_SECONDS, DB_READY_INTERVAL_SECONDS)) else 1)
@@ -0,0 +1,38 @@
+import time
+from typing import Optional
+
+
+class RevocationList:
+
+    """
+    Revoked token ids, grouped into buckets by the token's exp.
+    A check only looks in the bucket the token's exp falls into, and whole buckets are
+    dropped once every token in them has expired, so memory follows live revocations only.
+    """
+
+    def __init__(self, bucket_seconds: int):
+        self.bucket_seconds = bucket_seconds
+        self._buckets: dict[int, set[str]] = {}
+        self.last_id = 0  # highest RevokedToken.id loaded so far, the /revocations cursor
+
+    def _bucket(self, exp: float) -> int:
+        return int(exp) // self.bucket_seconds
+
+    def add(self, jti: str, exp: float) -> None:
+        if exp <= time.time():
+            return  # already unusable
+        self._buckets.setdefault(self._bucket(exp), set()).add(jti)
+
+    def is_revoked(self, jti: Optional[str], exp: Optional[float]) -> bool:
+        if jti is None or exp is None:
+            return False
+        bucket = self._buckets.get(self._bucket(exp))
+        return bucket is not None and jti in bucket
+
+    def expire(self, now: Optional[float] = None) -> None:
+        current = self._bucket(time.time() if now is None else now)
+        for key in [key for key in self._buckets if key < current]:
+            del self._buckets[key]
+
+    def __len__(self) -> int:
+        return sum(len(bucket) for bucket in self._buckets.values())